@@ -0,0 +1,239 @@
+"""Price alerts: evaluated in one pass per ingest, delivered from an outbox by the job worker.
+
+Enabled rules are loaded once per ingest into a RuleIndex keyed by scope
+(vendor, town or everyone) and kind, with each bucket's thresholds sorted.
+Matching a price is then a few dictionary lookups and a bisect per bucket,
+so the cost grows with the rules that fire rather than with the number of
+rules. A rule fires when a vendor's price crosses it, not on every price
+that stays past it. Fired alerts go into AlertOutbox in the ingest
+transaction; the unique (rule, vendor, date) key keeps a re-scraped price
+from firing twice.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+import logging
+import smtplib
+import numpy as np
+from sqlalchemy import select
+from models import db, User, Vendor, LatestPrice, AlertRule, AlertOutbox, upsert
+from latest import newest_prices
+from analytics import federal_as_of
+
+logger = logging.getLogger(__name__)
+
+KINDS = {
+    'below': 'Price drops below',
+    'under_federal': 'Price undercuts the federal average by more than',
+}
+
+# Backfilled or stale prices don't alert
+MAX_AGE_DAYS = 7
+
+def normalize_town(town):
+    return (town or '').strip().lower() or None
+
+class RuleIndex:
+    """Enabled alert rules bucketed by (scope, key, kind), each bucket sorted by threshold."""
+
+    def __init__(self, rules):
+        buckets = defaultdict(list)
+        for rule in rules:
+            if rule.vendor_id is not None:
+                scope = ('vendor', rule.vendor_id)
+            elif normalize_town(rule.town):
+                scope = ('town', normalize_town(rule.town))
+            else:
+                scope = ('all', None)
+            buckets[scope + (rule.kind,)].append((rule.threshold, rule.id))
+        self.buckets = {}
+        for key, entries in buckets.items():
+            entries.sort()
+            self.buckets[key] = ([threshold for threshold, _ in entries], [rule_id for _, rule_id in entries])
+        self.rules = {rule.id: rule for rule in rules}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def matches(self, vendor_id, town, price, federal_price=None, previous_price=None, previous_federal_price=None):
+        """Ids of the rules a vendor's price newly fires.
+
+        A rule fires when the price crosses it: one the previous price
+        already met is not fired again. Without a previous price every
+        rule the price meets fires.
+        """
+        gap = previous_gap = None
+        if federal_price is not None:
+            gap = round(federal_price - price, 6)
+            if previous_price is not None and previous_federal_price is not None:
+                previous_gap = round(previous_federal_price - previous_price, 6)
+
+        for scope in (('vendor', vendor_id), ('town', normalize_town(town)), ('all', None)):
+            below = self.buckets.get(scope + ('below',))
+            if below is not None:
+                # Thresholds in (price, previous_price]
+                thresholds, rule_ids = below
+                end = len(thresholds) if previous_price is None else bisect_right(thresholds, previous_price)
+                yield from rule_ids[bisect_right(thresholds, price):end]
+            under = self.buckets.get(scope + ('under_federal',))
+            if under is not None and gap is not None:
+                # Margins in [previous_gap, gap)
+                thresholds, rule_ids = under
+                begin = 0 if previous_gap is None else bisect_left(thresholds, previous_gap)
+                yield from rule_ids[begin:bisect_left(thresholds, gap)]
+
+def alert_message(rule, vendor, price, federal_price):
+    where = f"{vendor.name} ({vendor.town})" if vendor.town else vendor.name
+    if rule.kind == 'below':
+        return f"{where} is at ${price:.3f}/gal, below your ${rule.threshold:.2f} alert."
+    return f"{where} is at ${price:.3f}/gal, ${federal_price - price:.2f} under the federal average of ${federal_price:.3f}."
+
+def evaluate_alerts(prices, series_code=None, today=None):
+    """Record the alerts fired by prices, an iterable of {'vendor_id', 'date', 'price'} rows. Returns the count.
+
+    Only each vendor's newest price in the batch is considered, and only if
+    it is recent and still the vendor's latest price in LatestPrice, so call
+    this after refresh_latest_prices. It is compared with the price before
+    it: LatestPrice's previous price when deltas are kept, otherwise looked
+    up in PriceData. Does not commit; callers run this inside their ingest
+    transaction.
+    """
+    today = today or date.today()
+    newest = {}
+    for row in prices:
+        if row['date'] >= today - timedelta(days=MAX_AGE_DAYS) and (
+            row['vendor_id'] not in newest or row['date'] > newest[row['vendor_id']]['date']
+        ):
+            newest[row['vendor_id']] = row
+    if not newest:
+        return 0
+
+    index = RuleIndex(db.session.execute(
+        select(AlertRule.id, AlertRule.user_id, AlertRule.kind, AlertRule.threshold, AlertRule.vendor_id, AlertRule.town)
+        .where(AlertRule.enabled)
+    ).all())
+    if not len(index):
+        return 0
+
+    latest = {
+        row.vendor_id: row
+        for row in db.session.execute(
+            select(LatestPrice.vendor_id, LatestPrice.date, LatestPrice.previous_price, LatestPrice.previous_date)
+            .where(LatestPrice.vendor_id.in_(list(newest)))
+        )
+    }
+    # A backfilled row older than the vendor's current price is history, not a price move
+    newest = {
+        vendor_id: row
+        for vendor_id, row in newest.items()
+        if vendor_id in latest and latest[vendor_id].date == row['date']
+    }
+    if not newest:
+        return 0
+
+    # (date, price) of the price before each vendor's newest one
+    previous = {}
+    for vendor_id, row in newest.items():
+        current = latest[vendor_id]
+        if current.previous_date is not None:
+            previous[vendor_id] = (current.previous_date, current.previous_price)
+            continue
+        # Deltas aren't kept (or this is the vendor's first price): read it through the (vendor_id, date) index
+        earlier = [(day, price) for day, price in newest_prices(vendor_id, 2).items() if day < row['date']]
+        if earlier:
+            previous[vendor_id] = earlier[0]
+
+    vendors = {vendor.id: vendor for vendor in db.session.execute(select(Vendor).where(Vendor.id.in_(list(newest)))).scalars()}
+    dates = [row['date'] for row in newest.values()] + [day for day, _ in previous.values()]
+    start = min(dates)
+    federal = federal_as_of(series_code, start, (max(dates) - start).days + 1)
+
+    def federal_on(day):
+        price = federal[(day - start).days]
+        return None if np.isnan(price) else float(price)
+
+    now = datetime.now()
+    fired = []
+    for vendor_id, row in newest.items():
+        vendor = vendors[vendor_id]
+        federal_price = federal_on(row['date'])
+        previous_date, previous_price = previous.get(vendor_id, (None, None))
+        matches = index.matches(
+            vendor_id, vendor.town, row['price'], federal_price,
+            previous_price,
+            federal_on(previous_date) if previous_date else None,
+        )
+        for rule_id in matches:
+            rule = index.rules[rule_id]
+            fired.append({
+                'rule_id': rule_id,
+                'user_id': rule.user_id,
+                'vendor_id': vendor_id,
+                'date': row['date'],
+                'price': row['price'],
+                'federal_price': federal_price,
+                'message': alert_message(rule, vendor, row['price'], federal_price),
+                'status': 'pending',
+                'attempts': 0,
+                'created_at': now,
+            })
+
+    upsert(AlertOutbox, fired, ['rule_id', 'vendor_id', 'date'], [])
+    logger.info(f"Evaluated {len(index)} alert rules against {len(newest)} vendor prices: {len(fired)} fired")
+    return len(fired)
+
+def pending_alerts():
+    return db.session.execute(select(AlertOutbox.id).where(AlertOutbox.status == 'pending').limit(1)).first() is not None
+
+class AlertDelivery:
+    """Drains AlertOutbox, mailing each alert when mail is configured; otherwise alerts are only shown in the app."""
+
+    def __init__(self, mail_server=None, mail_port=25, mail_sender=None, max_attempts=5, batch_size=100):
+        self.mail_server = mail_server
+        self.mail_port = mail_port
+        self.mail_sender = mail_sender
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+
+    def send(self, entry, email):
+        message = EmailMessage()
+        message['Subject'] = 'Heating oil price alert'
+        message['From'] = self.mail_sender
+        message['To'] = email
+        message.set_content(entry.message)
+        with smtplib.SMTP(self.mail_server, self.mail_port, timeout=30) as smtp:
+            smtp.send_message(message)
+
+    def drain(self):
+        """Deliver pending alerts, a batch per transaction. Returns (sent, failed)."""
+        sent = failed = 0
+        # Failures stay pending, so walk past them by id rather than re-reading them
+        last_id = 0
+        while True:
+            batch = db.session.execute(
+                select(AlertOutbox, User.email)
+                .join(User, User.id == AlertOutbox.user_id)
+                .where(AlertOutbox.status == 'pending', AlertOutbox.id > last_id)
+                .order_by(AlertOutbox.id)
+                .limit(self.batch_size)
+            ).all()
+            if not batch:
+                return sent, failed
+            for entry, email in batch:
+                last_id = entry.id
+                entry.attempts += 1
+                try:
+                    if self.mail_server and email:
+                        self.send(entry, email)
+                    entry.status = 'sent'
+                    entry.delivered_at = datetime.now()
+                    sent += 1
+                except Exception as e:
+                    logger.warning(f"Delivering alert {entry.id} failed: {str(e)}")
+                    entry.last_error = str(e)
+                    # Left pending for the next drain until it runs out of attempts
+                    if entry.attempts >= self.max_attempts:
+                        entry.status = 'failed'
+                    failed += 1
+            db.session.commit()
@@ -0,0 +1,130 @@
+"""Per-vendor market analytics: spread to the federal price, rolling means, volatility and rank.
+
+The last LOOKBACK_DAYS of PriceData are loaded into a vendors x days NumPy
+matrix, forward filled so each day holds the price in effect, and the
+weekly federal series is aligned to the same days with an as-of join.
+Every metric is then a whole-matrix operation rather than a loop over
+vendors. Ingests refresh the VendorAnalytics table inside their
+transaction, and the /analytics view and API only read it.
+"""
+from datetime import date, timedelta
+import logging
+import numpy as np
+from sqlalchemy import select, delete, type_coerce
+from models import db, PriceData, FederalSeries, FederalPriceData, VendorAnalytics, upsert
+
+logger = logging.getLogger(__name__)
+
+# Same cut-off as /prices: vendors with no price for this long drop out
+LOOKBACK_DAYS = 90
+RANK_CHANGE_DAYS = 7
+
+def forward_fill(matrix):
+    """Carry each row's last non-NaN value forward along the columns."""
+    columns = np.arange(matrix.shape[1])
+    last = np.maximum.accumulate(np.where(np.isnan(matrix), -1, columns), axis=1)
+    filled = np.take_along_axis(matrix, np.maximum(last, 0), axis=1)
+    return np.where(last >= 0, filled, np.nan)
+
+def window_mean_std(values):
+    """Row-wise mean and standard deviation of values, ignoring NaN; NaN for rows with no values."""
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=1)
+    zeroed = np.where(valid, values, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = zeroed.sum(axis=1) / count
+        variance = (zeroed ** 2).sum(axis=1) / count - mean ** 2
+    return mean, np.sqrt(np.maximum(variance, 0))
+
+def rank(prices):
+    """1-based rank of each price, cheapest first; 0 where the price is NaN."""
+    ranks = np.zeros(len(prices), dtype=int)
+    valid = np.flatnonzero(~np.isnan(prices))
+    ranks[valid[np.argsort(prices[valid], kind='stable')]] = np.arange(1, len(valid) + 1)
+    return ranks
+
+def federal_as_of(series_code, start, days):
+    """The federal price in effect on each of days days from start, by as-of join on the weekly series."""
+    if series_code is None:
+        return np.full(days, np.nan)
+    # Reach back far enough to have the week in effect on start
+    rows = db.session.execute(
+        select(FederalPriceData.date, FederalPriceData.price)
+        .join(FederalSeries)
+        .where(
+            FederalSeries.code == series_code,
+            FederalPriceData.date > start - timedelta(days=31),
+            FederalPriceData.date < start + timedelta(days=days),
+        )
+        .order_by(FederalPriceData.date)
+    ).all()
+    if not rows:
+        return np.full(days, np.nan)
+    offsets = np.array([(row.date - start).days for row in rows])
+    prices = np.array([row.price for row in rows], dtype=float)
+    position = np.searchsorted(offsets, np.arange(days), side='right') - 1
+    return np.where(position >= 0, prices[np.maximum(position, 0)], np.nan)
+
+def compute_analytics(series_code=None, as_of=None):
+    """Metrics for every vendor priced in the LOOKBACK_DAYS up to as_of, as VendorAnalytics rows."""
+    as_of = as_of or date.today()
+    start = as_of - timedelta(days=LOOKBACK_DAYS - 1)
+    # Core rows with ISO date strings, which NumPy parses in one call
+    rows = db.session.connection().execute(
+        select(PriceData.vendor_id, type_coerce(PriceData.date, db.String), PriceData.price)
+        .where(PriceData.date >= start, PriceData.date <= as_of)
+    ).all()
+    if not rows:
+        return []
+
+    vendor_column, date_column, price_column = zip(*rows)
+    vendor_ids, vendor_index = np.unique(np.array(vendor_column), return_inverse=True)
+    day_index = (np.array(date_column, dtype='datetime64[D]') - np.datetime64(start)).astype(int)
+    posted = np.full((len(vendor_ids), LOOKBACK_DAYS), np.nan)
+    posted[vendor_index, day_index] = price_column
+    last_posted = np.maximum.accumulate(np.where(np.isnan(posted), -1, np.arange(LOOKBACK_DAYS)), axis=1)[:, -1]
+
+    filled = forward_fill(posted)
+    federal = federal_as_of(series_code, start, LOOKBACK_DAYS)
+    price = filled[:, -1]
+    mean_7d, _ = window_mean_std(filled[:, -7:])
+    mean_30d, _ = window_mean_std(filled[:, -30:])
+    spread_30d, _ = window_mean_std(filled[:, -30:] - federal[-30:])
+    # Volatility: spread of the day-over-day relative changes in the price in effect
+    with np.errstate(invalid='ignore', divide='ignore'):
+        changes = filled[:, -30:] / filled[:, -31:-1] - 1
+    _, volatility_30d = window_mean_std(changes)
+    ranks = rank(price)
+    previous_ranks = rank(filled[:, -1 - RANK_CHANGE_DAYS])
+
+    def value(number):
+        return None if np.isnan(number) else round(float(number), 4)
+
+    return [
+        {
+            'vendor_id': int(vendor_ids[i]),
+            'date': as_of,
+            'price': float(price[i]),
+            'price_date': start + timedelta(days=int(last_posted[i])),
+            'federal_price': value(federal[-1]),
+            'spread': value(price[i] - federal[-1]),
+            'spread_30d': value(spread_30d[i]),
+            'mean_7d': value(mean_7d[i]),
+            'mean_30d': value(mean_30d[i]),
+            'volatility_30d': value(volatility_30d[i]),
+            'rank': int(ranks[i]),
+            'rank_change': int(previous_ranks[i] - ranks[i]) if previous_ranks[i] else None,
+        }
+        for i in range(len(vendor_ids))
+    ]
+
+def refresh_analytics(series_code=None, as_of=None):
+    """Recompute VendorAnalytics for all vendors.
+
+    Does not commit; callers run this inside their ingest transaction.
+    """
+    rows = compute_analytics(series_code, as_of)
+    db.session.execute(delete(VendorAnalytics).where(VendorAnalytics.vendor_id.notin_([row['vendor_id'] for row in rows])))
+    upsert(VendorAnalytics, rows, ['vendor_id'], [column for column in rows[0] if column != 'vendor_id'] if rows else [])
+    logger.info(f"Refreshed analytics for {len(rows)} vendors")
+    return len(rows)
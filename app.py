@@ -1,6 +1,9 @@
+import json
 import logging
-import requests
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+import os
+import time
+import click
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from flask_apscheduler import APScheduler
@@ -8,9 +11,25 @@ from flask_migrate import Migrate
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 from scraper import Scraper
-from models import db, User, Vendor, PriceData, ScrapeLog, FederalPriceData
+from federal import FederalFetcher
+from extractors import BACKENDS, etree
+from models import db, User, Vendor, PriceData, LatestPrice, ScrapeLog, ScrapeArtifact, FederalSeries, FederalPriceData, VendorPriceRollup, VendorAnalytics, AlertRule, AlertOutbox, JobSchedule, Job, current_data_version
+from rollups import bucket_start, choose_granularity, rebuild_rollups
+from analytics import refresh_analytics
+from alerts import KINDS as ALERT_KINDS, AlertDelivery, pending_alerts
+from charts import epoch_day, downsample, legacy_payload, columnar_payload
+from cache import ResponseCache, not_modified, conditional
+from leader import LeaderElection
+from database import read_db
+from metrics import metrics
+from jobs import JobQueue, ACTIVE
+from history import PAGE_SIZE, scrape_log_page, daily_summaries, compact_scrape_logs
+from series import RANK_BY, rank_vendors, price_series
+from export import FORMATS, COLUMNS, export
+from importer import Importer
+from archive import PageArchive
 from config import Config
-from sqlalchemy import func, select, and_, desc
+from sqlalchemy import func, select, desc
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -21,15 +40,56 @@ app.config.from_object(Config)
 
 # Initialize extensions
 db.init_app(app)
-migrate = Migrate(app, db)
+read_db.init_app(app)
+metrics.init_app(app)
+migrate = Migrate(app, db, render_as_batch=True)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
+response_cache = ResponseCache(app)
 scheduler = APScheduler()
 scheduler.init_app(app)
-scheduler.start()
+job_queue = JobQueue(app, poll_interval=app.config['JOB_POLL_INTERVAL'])
+
+def start_background_work():
+    scheduler.start()
+    job_queue.start()
+
+# Only one process on the host runs scheduled and queued jobs; the others stand by to take over
+leader = LeaderElection(
+    app.config['SCHEDULER_LOCK_PATH'] or os.path.join(app.instance_path, 'scheduler.lock'),
+    on_elected=start_background_work,
+    retry_interval=app.config['SCHEDULER_LEADER_RETRY'],
+)
+
+# Raw pages and API responses are kept so they can be parsed again offline
+page_archive = PageArchive(app.config['ARCHIVE_DIR'] or os.path.join(app.instance_path, 'archive')) if app.config['ARCHIVE_ENABLED'] else None
 
 # Create a single Scraper instance
-scraper = Scraper()
+scraper = Scraper(
+    zones=app.config['SCRAPE_ZONES'],
+    base_url=app.config['SCRAPE_BASE_URL'],
+    max_workers=app.config['SCRAPE_MAX_WORKERS'],
+    timeout=app.config['SCRAPE_TIMEOUT'],
+    parser=app.config['SCRAPER_PARSER'],
+    price_deltas=app.config['LATEST_PRICE_DELTAS'],
+    benchmark_series=app.config['EIA_SERIES'][0],
+    archive=page_archive,
+)
+
+federal_fetcher = FederalFetcher(
+    api_key=app.config['EIA_API_KEY'],
+    base_url=app.config['EIA_API_URL'],
+    series=app.config['EIA_SERIES'],
+    page_size=app.config['EIA_PAGE_SIZE'],
+    archive=page_archive,
+)
+
+alert_delivery = AlertDelivery(
+    mail_server=app.config['MAIL_SERVER'],
+    mail_port=app.config['MAIL_PORT'],
+    mail_sender=app.config['MAIL_SENDER'],
+    max_attempts=app.config['ALERT_MAX_ATTEMPTS'],
+)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -48,15 +108,67 @@ def create_user(username, password):
         db.session.commit()
         logger.info(f"User {username} created successfully")
 
-# Scraping function
-def perform_scrape(scheduled=False):
+@app.cli.command('check-extractors')
+@click.argument('pages', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def check_extractors(pages):
+    """Check that every table extraction backend matches BeautifulSoup on saved pages."""
+    backends = [name for name in BACKENDS if name != 'bs4' and (name != 'lxml' or etree is not None)]
+    mismatches = 0
+    for path in pages:
+        with open(path, 'rb') as f:
+            content = f.read()
+        expected = BACKENDS['bs4'](content)
+        for name in backends:
+            if BACKENDS[name](content) != expected:
+                mismatches += 1
+                click.echo(f"{path}: {name} differs from bs4")
+    click.echo(f"Checked {len(pages)} page(s) against {', '.join(backends)}: {mismatches} mismatch(es)")
+    if mismatches:
+        raise SystemExit(1)
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the day/week/month price rollups from PriceData."""
+    vendors = rebuild_rollups()
+    click.echo(f"Rebuilt rollups for {vendors} vendor(s)")
+
+@app.cli.command('refresh-analytics')
+def refresh_analytics_command():
+    """Recompute vendor spreads, rolling means, volatility and ranks."""
+    vendors = refresh_analytics(app.config['EIA_SERIES'][0])
+    db.session.commit()
+    click.echo(f"Refreshed analytics for {vendors} vendor(s)")
+
+def stage_timings(progress):
+    """ScrapeLog stage timing columns from a job's progress."""
+    if progress is None:
+        return {}
+    progress.finish()
+    return {f"{stage}_seconds": progress.timings.get(stage) for stage in ('fetch', 'parse', 'write')}
+
+# Scraping function, run by the job worker
+@job_queue.register('Local')
+def perform_scrape(scheduled=False, progress=None):
     logger.info(f"{'Scheduled' if scheduled else 'Manual'} scrape initiated")
+    started = time.perf_counter()
+    artifacts = []
     try:
-        scraper.scrape()
-        success = True
-        message = 'Scraping completed successfully.'
+        result = scraper.scrape(progress=progress, artifacts=artifacts)
+        success = not result['failed']
+        summary = f"{result['rows']} prices from {len(result['zones'])} zone(s)"
+        if result['unchanged']:
+            summary += f", skipped {len(result['unchanged'])} unchanged zone(s)"
+        if result['failed']:
+            failures = '; '.join(f"{zone} ({error})" for zone, error in result['failed'].items())
+            message = f"Scraping completed with errors. {summary}; failed: {failures}"
+        elif not result['zones']:
+            message = f"Scraping skipped, all {len(result['unchanged'])} zone(s) unchanged."
+        else:
+            message = f"Scraping completed successfully. {summary}."
         logger.info(message)
     except Exception as e:
+        # Drop whatever part of the ingest was written, so it can't be committed with the log entry
+        db.session.rollback()
         success = False
         message = f"Error during scraping: {str(e)}"
         logger.error(message, exc_info=True)
@@ -67,64 +179,169 @@ def perform_scrape(scheduled=False):
         success=success,
         message=message,
         scheduled=scheduled,
-        scrape_type='Local'  # Add this line to set the scrape_type
+        scrape_type='Local',  # Add this line to set the scrape_type
+        duration=time.perf_counter() - started,
+        **stage_timings(progress),
     )
     db.session.add(log_entry)
+    db.session.add_all(ScrapeArtifact(scrape_log=log_entry, **artifact) for artifact in artifacts)
     db.session.commit()
+
+    # Alerts fired by the new prices are delivered by their own job
+    if pending_alerts():
+        job_queue.enqueue('Alerts')
     
     return success, message
 
+# Scheduled jobs can be switched off from the Scrape page; the flag lives in the
+# database so it applies to whichever process is currently the scheduler leader
+def job_enabled(job_id):
+    schedule = db.session.get(JobSchedule, job_id)
+    return schedule is None or schedule.enabled
+
+def set_job_enabled(job_id, enabled):
+    schedule = db.session.get(JobSchedule, job_id)
+    if schedule is None:
+        schedule = JobSchedule(job_id=job_id)
+        db.session.add(schedule)
+    schedule.enabled = enabled
+    db.session.commit()
+
 # Scheduled task to scrape local data
 @scheduler.task('cron', id='daily_scrape', hour=10)
 def scheduled_scrape():
     with app.app_context():
-        perform_scrape(scheduled=True)
+        if job_enabled('daily_scrape'):
+            job_queue.enqueue('Local', scheduled=True)
+        else:
+            logger.info("Scheduled scrape skipped (disabled)")
 
 # Fetch data from the Fed's EIA site on oil prices
-def fetch_federal_data():
-    api_key = "r5rztCthY9srZ1aBSnuzNZwcREkSujGwmXcAQ5KW"
-    url = f"https://api.eia.gov/v2/petroleum/pri/wfr/data/?frequency=weekly&data[0]=value&facets[series][]=W_EPD2F_PRS_SRI_DPG&sort[0][column]=period&sort[0][direction]=desc&offset=0&length=5000&api_key={api_key}"
-    
-    logger.info(f"Fetching federal data from URL: {url}")
+def fetch_federal_data(full=False, progress=None, artifacts=None):
+    logger.info(f"Fetching federal data ({'full history' if full else 'incremental'})")
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        
-        logger.info(f"Received {len(data['response']['data'])} data points from the API")
-        
-        new_entries = 0
-        updated_entries = 0
-        for item in data['response']['data']:
-            date = datetime.strptime(item['period'], "%Y-%m-%d").date()
-            price = float(item['value'])
-            
-            existing_data = FederalPriceData.query.filter_by(date=date).first()
-            if existing_data:
-                if existing_data.price != price:
-                    existing_data.price = price
-                    updated_entries += 1
-            else:
-                new_data = FederalPriceData(date=date, price=price)
-                db.session.add(new_data)
-                new_entries += 1
-        
-        db.session.commit()
+        new_entries, updated_entries = federal_fetcher.fetch(full=full, progress=progress, artifacts=artifacts)
         logger.info(f"Federal price data updated successfully. New entries: {new_entries}, Updated entries: {updated_entries}")
         return True, f"Federal data updated. New: {new_entries}, Updated: {updated_entries}"
     except Exception as e:
+        db.session.rollback()
         logger.error(f"Error fetching federal price data: {str(e)}", exc_info=True)
         return False, f"Error fetching federal data: {str(e)}"
 
+@app.cli.command('fetch-federal')
+@click.option('--full', is_flag=True, help='Re-fetch the whole history instead of only new weeks.')
+def fetch_federal_command(full):
+    """Fetch EIA federal price series."""
+    success, message = fetch_federal_data(full=full)
+    click.echo(message)
+    if not success:
+        raise SystemExit(1)
+
+@job_queue.register('Federal')
+def perform_federal_fetch(scheduled=False, progress=None):
+    started = time.perf_counter()
+    artifacts = []
+    success, message = fetch_federal_data(progress=progress, artifacts=artifacts)
+    log_entry = ScrapeLog(
+        timestamp=datetime.now(),
+        success=success,
+        message=message,
+        scheduled=scheduled,
+        scrape_type='Federal',
+        duration=time.perf_counter() - started,
+        **stage_timings(progress),
+    )
+    db.session.add(log_entry)
+    db.session.add_all(ScrapeArtifact(scrape_log=log_entry, **artifact) for artifact in artifacts)
+    db.session.commit()
+    return success, message
+
 # Scheduled task for federal data
-@scheduler.task('cron', id='fetch_federal_data', hour=7)
+@scheduler.task('cron', id='fetch_federal_data', hour=6)
 def scheduled_federal_data_fetch():
     with app.app_context():
-        success, message = fetch_federal_data()
-        if success:
-            logger.info("Scheduled federal data fetch completed successfully")
+        if job_enabled('fetch_federal_data'):
+            job_queue.enqueue('Federal', scheduled=True)
         else:
-            logger.error("Scheduled federal data fetch failed")
+            logger.info("Scheduled federal data fetch skipped (disabled)")
+
+@job_queue.register('Alerts')
+def deliver_alerts(scheduled=False, progress=None):
+    sent, failed = alert_delivery.drain()
+    message = f"Delivered {sent} alert(s)" + (f", {failed} failed" if failed else "")
+    logger.info(message)
+    return not failed, message
+
+# Retry alerts whose delivery failed
+@scheduler.task('interval', id='deliver_alerts', minutes=15)
+def scheduled_alert_delivery():
+    with app.app_context():
+        if pending_alerts():
+            job_queue.enqueue('Alerts', scheduled=True)
+
+@app.cli.command('export')
+@click.argument('dataset', type=click.Choice(list(COLUMNS)))
+@click.option('--format', 'fmt', type=click.Choice(list(FORMATS)), default='csv', help='Output format.')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First date to include.')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last date to include.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', '-o', type=click.File('wb'), default='-', help='File to write (defaults to stdout).')
+def export_command(dataset, fmt, start, end, compress, output):
+    """Stream vendor prices or federal prices as CSV or NDJSON."""
+    for chunk in export(dataset, fmt, start and start.date(), end and end.date(), compress):
+        output.write(chunk)
+
+@app.cli.command('import-prices')
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--zone', help='Zone of saved pages and of CSV rows without one (defaults to the first SCRAPE_ZONES entry).')
+@click.option('--chunk-size', type=int, default=50000, show_default=True, help='Records written per transaction.')
+def import_prices_command(paths, zone, chunk_size):
+    """Backfill prices from CSV files and saved price pages; rerun to resume."""
+    importer = Importer(scraper, zone or app.config['SCRAPE_ZONES'][0], chunk_size=chunk_size)
+    importer.run(paths, report=click.echo)
+
+@app.cli.command('reparse-archive')
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), help='Only pages fetched on or after this date.')
+@click.option('--zone', 'zones', multiple=True, help='Only pages of this zone; repeat for several.')
+@click.option('--workers', type=int, help='Parser processes (defaults to the number of CPUs).')
+@click.option('--chunk-size', type=int, default=50000, show_default=True, help='Records written per transaction.')
+def reparse_archive_command(since, zones, workers, chunk_size):
+    """Parse archived price pages again and rewrite their prices, without fetching anything."""
+    if page_archive is None:
+        raise click.ClickException('The page archive is disabled (ARCHIVE_ENABLED)')
+    query = (
+        select(ScrapeArtifact.sha256, ScrapeArtifact.key)
+        .where(ScrapeArtifact.source == 'Local')
+        .group_by(ScrapeArtifact.sha256, ScrapeArtifact.key)
+        # By the last time each body was served, so a page that came back after a change is applied after it
+        .order_by(func.max(ScrapeArtifact.fetched_at))
+    )
+    if since:
+        query = query.where(ScrapeArtifact.fetched_at >= since)
+    if zones:
+        query = query.where(ScrapeArtifact.key.in_(zones))
+    pages = db.session.execute(query).all()
+    click.echo(f"Re-parsing {len(pages)} archived page(s)")
+    importer = Importer(scraper, app.config['SCRAPE_ZONES'][0], chunk_size=chunk_size)
+    total, failed, _ = importer.reparse_archive(page_archive, pages, app.config['SCRAPER_PARSER'], workers, report=click.echo)
+    if failed:
+        raise SystemExit(1)
+
+# Old scrape log entries are rolled up into daily summaries
+@app.cli.command('compact-scrape-logs')
+@click.option('--retention-days', type=int, help='Keep entries this many days (defaults to SCRAPE_LOG_RETENTION_DAYS).')
+def compact_scrape_logs_command(retention_days):
+    """Roll scrape log entries past the retention period into daily summaries."""
+    if retention_days is None:
+        retention_days = app.config['SCRAPE_LOG_RETENTION_DAYS']
+    removed = compact_scrape_logs(retention_days)
+    click.echo(f"Compacted {removed} scrape log entries older than {retention_days} days")
+
+@scheduler.task('cron', id='compact_scrape_logs', hour=3)
+def scheduled_log_compaction():
+    with app.app_context():
+        if app.config['SCRAPE_LOG_RETENTION_DAYS']:
+            compact_scrape_logs(app.config['SCRAPE_LOG_RETENTION_DAYS'])
 
 # Routes
 @app.route('/')
@@ -160,32 +377,66 @@ def logout():
 @login_required
 def scrape_page():
     if request.method == 'POST':
-        if 'local_scrape' in request.form:
-            success, message = perform_scrape()
-        elif 'federal_data' in request.form:
-            success, message = fetch_federal_data()
-        
-        # Log the attempt for both local and federal data
-        log_entry = ScrapeLog(
-            timestamp=datetime.now(),
-            success=success,
-            message=message,
-            scheduled=False,
-            scrape_type='Local' if 'local_scrape' in request.form else 'Federal'
-        )
-        db.session.add(log_entry)
-        db.session.commit()
-        
-        flash(message, 'success' if success else 'error')
+        # The job worker does the scrape; the request only queues it
+        job_type = 'Local' if 'local_scrape' in request.form else 'Federal'
+        job, merged = job_queue.enqueue(job_type)
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return jsonify(job_id=job.id, merged=merged, status_url=url_for('job_status', job_id=job.id)), 202
+
+        if merged:
+            flash(f"A {job_type.lower()} job is already {job.status}; your request was merged into job #{job.id}.", 'info')
+        else:
+            flash(f"{job_type} job #{job.id} queued.", 'success')
         return redirect(url_for('scrape_page'))
     
-    logs = ScrapeLog.query.order_by(ScrapeLog.timestamp.desc()).all()
-    local_job = scheduler.get_job('daily_scrape')
-    federal_job = scheduler.get_job('fetch_federal_data')
-    is_local_scheduled = local_job is not None and local_job.next_run_time is not None
-    is_federal_scheduled = federal_job is not None and federal_job.next_run_time is not None
+    # History filters; '' and missing both mean "any"
+    filters = {
+        'type': request.args.get('type') or None,
+        'success': request.args.get('success') or None,
+        'scheduled': request.args.get('scheduled') or None,
+    }
+    success = None if filters['success'] is None else filters['success'] == '1'
+    scheduled = None if filters['scheduled'] is None else filters['scheduled'] == '1'
+    try:
+        logs, older, newer = scrape_log_page(
+            scrape_type=filters['type'],
+            success=success,
+            scheduled=scheduled,
+            before=request.args.get('before'),
+            after=request.args.get('after'),
+            limit=PAGE_SIZE,
+        )
+    except ValueError:
+        abort(400)
+    summaries = daily_summaries(scrape_type=filters['type'], scheduled=scheduled)
+    filters = {name: value for name, value in filters.items() if value is not None}
+    active_jobs = Job.query.filter(Job.status.in_(ACTIVE)).order_by(Job.id).all()
+    # Queued jobs only run in the scheduler leader; with none (SCHEDULER_ENABLED=false everywhere) they wait
+    worker_running = leader.held()
+    is_local_scheduled = job_enabled('daily_scrape')
+    is_federal_scheduled = job_enabled('fetch_federal_data')
     
-    return render_template('scrape.html', logs=logs, is_local_scheduled=is_local_scheduled, is_federal_scheduled=is_federal_scheduled)
+    return render_template('scrape.html', logs=logs, older=older, newer=newer, filters=filters, summaries=summaries,
+                           retention_days=app.config['SCRAPE_LOG_RETENTION_DAYS'], active_jobs=active_jobs, worker_running=worker_running, is_local_scheduled=is_local_scheduled, is_federal_scheduled=is_federal_scheduled)
+
+@app.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify(success=False, message="Job not found"), 404
+    return jsonify(
+        id=job.id,
+        type=job.job_type,
+        status=job.status,
+        stage=job.stage,
+        scheduled=job.scheduled,
+        message=job.message,
+        timings=json.loads(job.timings) if job.timings else {},
+        created_at=job.created_at.isoformat(),
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+    )
 
 @app.route('/toggle_schedule', methods=['POST'])
 @login_required
@@ -200,115 +451,498 @@ def toggle_schedule():
     else:
         return jsonify(success=False, message="Invalid schedule type"), 400
     
+    set_job_enabled(job_id, bool(is_scheduled))
     if is_scheduled:
-        scheduler.resume_job(job_id)
         logger.info(f"Scheduled {schedule_type} data scraping resumed")
     else:
-        scheduler.pause_job(job_id)
         logger.info(f"Scheduled {schedule_type} data scraping paused")
     
     return jsonify(success=True)
 
-# Modify the scheduled task for federal data to check if it's enabled
-@scheduler.task('cron', id='fetch_federal_data', hour=6)
-def scheduled_federal_data_fetch():
-    with app.app_context():
-        job = scheduler.get_job('fetch_federal_data')
-        if job and job.next_run_time is not None:
-            success, message = fetch_federal_data()
-            log_entry = ScrapeLog(
-                timestamp=datetime.now(),
-                success=success,
-                message=message,
-                scheduled=True,
-                scrape_type='Federal'
-            )
-            db.session.add(log_entry)
-            db.session.commit()
-            if success:
-                logger.info("Scheduled federal data fetch completed successfully")
-            else:
-                logger.error("Scheduled federal data fetch failed")
+@app.route('/alerts', methods=['GET', 'POST'])
+@login_required
+def alerts():
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        vendor_id = request.form.get('vendor_id', type=int)
+        town = (request.form.get('town') or '').strip() or None
+        try:
+            threshold = float(request.form.get('threshold', ''))
+        except ValueError:
+            threshold = None
+        if kind not in ALERT_KINDS or threshold is None or threshold < 0:
+            flash('Choose an alert type and a threshold of zero or more.', 'error')
+        elif vendor_id is not None and db.session.get(Vendor, vendor_id) is None:
+            flash('Unknown vendor.', 'error')
         else:
-            logger.info("Scheduled federal data fetch skipped (disabled)")
+            db.session.add(AlertRule(
+                user_id=current_user.id,
+                kind=kind,
+                threshold=threshold,
+                vendor_id=vendor_id,
+                town=None if vendor_id is not None else town,
+                created_at=datetime.now(),
+            ))
+            db.session.commit()
+            flash('Alert added.', 'success')
+        return redirect(url_for('alerts'))
+
+    rules = AlertRule.query.filter_by(user_id=current_user.id).order_by(AlertRule.id).all()
+    fired = (
+        AlertOutbox.query.filter_by(user_id=current_user.id)
+        .order_by(AlertOutbox.id.desc())
+        .limit(50)
+        .all()
+    )
+    vendors = read_db.session.execute(select(Vendor.id, Vendor.name, Vendor.town).order_by(Vendor.name)).all()
+    towns = sorted({vendor.town for vendor in vendors if vendor.town})
+    return render_template(
+        'alerts.html',
+        rules=rules,
+        fired=fired,
+        vendors=vendors,
+        towns=towns,
+        kinds=ALERT_KINDS,
+        mail_enabled=bool(app.config['MAIL_SERVER']),
+    )
+
+def own_alert_rule(rule_id):
+    rule = db.session.get(AlertRule, rule_id)
+    if rule is None or rule.user_id != current_user.id:
+        abort(404)
+    return rule
+
+@app.route('/alerts/<int:rule_id>/toggle', methods=['POST'])
+@login_required
+def toggle_alert(rule_id):
+    rule = own_alert_rule(rule_id)
+    rule.enabled = not rule.enabled
+    db.session.commit()
+    return redirect(url_for('alerts'))
+
+@app.route('/alerts/<int:rule_id>/delete', methods=['POST'])
+@login_required
+def delete_alert(rule_id):
+    rule = own_alert_rule(rule_id)
+    AlertOutbox.query.filter_by(rule_id=rule.id).delete()
+    db.session.delete(rule)
+    db.session.commit()
+    flash('Alert deleted.', 'success')
+    return redirect(url_for('alerts'))
+
+@app.route('/alerts/email', methods=['POST'])
+@login_required
+def alert_email():
+    email = (request.form.get('email') or '').strip()
+    if email and '@' not in email:
+        flash('Enter a valid email address.', 'error')
+    else:
+        current_user.email = email or None
+        db.session.commit()
+        flash('Alert email saved.', 'success')
+    return redirect(url_for('alerts'))
 
 @app.route('/prices')
 @login_required
 def prices():
-    # Calculate the date 3 months ago from today
-    three_months_ago = datetime.now().date() - timedelta(days=90)
-
-    # Subquery to get the latest price for each vendor within the last 3 months
-    latest_prices_subquery = (
-        select(
-            PriceData.vendor_id,
-            func.max(PriceData.date).label('max_date')
+    today = datetime.now().date()
+    version = current_data_version()
+    key = response_cache.key('prices', {'today': today})
+    etag = response_cache.etag(key, version, current_user.id)
+    if not_modified(etag):
+        return conditional(make_response('', 304), etag)
+
+    def build():
+        # Vendors whose latest price is within the last 3 months, cheapest first
+        three_months_ago = today - timedelta(days=90)
+        query = (
+            select(Vendor.name, LatestPrice.price, LatestPrice.date, LatestPrice.previous_price)
+            .select_from(LatestPrice)
+            .join(Vendor, Vendor.id == LatestPrice.vendor_id)
+            .where(LatestPrice.date >= three_months_ago)
+            .order_by(LatestPrice.price)
         )
-        .where(PriceData.date >= three_months_ago)
-        .group_by(PriceData.vendor_id)
-        .subquery()
-    )
 
-    # Query to get the latest prices for all vendors, sorted by price
+        return [
+            {
+                'Vendor': {'name': row.name},
+                'PriceData': {'price': row.price, 'date': row.date.isoformat()},
+                'change': None if row.previous_price is None else round(row.price - row.previous_price, 3),
+            }
+            for row in read_db.session.execute(query)
+        ]
+
+    latest_prices = response_cache.get_or_build(key, version, build)
+
+    logger.info(f"Prices page accessed by user {current_user.username}")
+    return conditional(make_response(render_template('prices.html', latest_prices=latest_prices)), etag)
+
+ANALYTICS_SORTS = {
+    'rank': VendorAnalytics.rank,
+    'spread': VendorAnalytics.spread,
+    'volatility': desc(VendorAnalytics.volatility_30d),
+    'rank_change': desc(VendorAnalytics.rank_change),
+}
+
+def analytics_rows(zone, sort):
     query = (
-        select(Vendor, PriceData)
-        .select_from(Vendor)
-        .join(PriceData, Vendor.id == PriceData.vendor_id)
-        .join(
-            latest_prices_subquery,
-            and_(
-                Vendor.id == latest_prices_subquery.c.vendor_id,
-                PriceData.date == latest_prices_subquery.c.max_date
-            )
-        )
-        .order_by(PriceData.price)  # Sort by price, lowest to highest
+        select(VendorAnalytics, Vendor.name, Vendor.town, Vendor.zone)
+        .join(Vendor, Vendor.id == VendorAnalytics.vendor_id)
+        .order_by(ANALYTICS_SORTS[sort].nulls_last(), VendorAnalytics.rank)
     )
+    if zone:
+        query = query.where(Vendor.zone == zone)
+    return [
+        {
+            'vendor_id': row.VendorAnalytics.vendor_id,
+            'name': row.name,
+            'town': row.town,
+            'zone': row.zone,
+            **{
+                column: getattr(row.VendorAnalytics, column)
+                for column in ('price', 'federal_price', 'spread', 'spread_30d', 'mean_7d', 'mean_30d', 'volatility_30d', 'rank', 'rank_change')
+            },
+            'date': row.VendorAnalytics.date.isoformat(),
+            'price_date': row.VendorAnalytics.price_date.isoformat(),
+        }
+        for row in read_db.session.execute(query)
+    ]
 
-    latest_prices = db.session.execute(query).all()
+@app.route('/analytics')
+@login_required
+def analytics():
+    sort = request.args.get('sort') or 'rank'
+    if sort not in ANALYTICS_SORTS:
+        sort = 'rank'
+    zone = request.args.get('zone') or None
+    version = current_data_version()
+    key = response_cache.key('analytics', {'zone': zone, 'sort': sort})
+    etag = response_cache.etag(key, version, current_user.id)
+    if not_modified(etag):
+        return conditional(make_response('', 304), etag)
 
-    logger.info(f"Prices page accessed by user {current_user.username}")
-    return render_template('prices.html', latest_prices=latest_prices)
+    rows = response_cache.get_or_build(key, version, lambda: analytics_rows(zone, sort))
+    zones = read_db.session.execute(select(Vendor.zone).distinct().where(Vendor.zone.isnot(None)).order_by(Vendor.zone)).scalars().all()
+    return conditional(make_response(render_template('analytics.html', rows=rows, zones=zones, zone=zone, sort=sort)), etag)
+
+@app.route('/api/analytics')
+@login_required
+def analytics_api():
+    """Per-vendor analytics as JSON. Query parameters: zone, and sort (rank, spread, volatility or rank_change)."""
+    sort = request.args.get('sort') or 'rank'
+    if sort not in ANALYTICS_SORTS:
+        return jsonify(success=False, message=f"sort must be one of {', '.join(ANALYTICS_SORTS)}"), 400
+    zone = request.args.get('zone') or None
+    version = current_data_version()
+    key = response_cache.key('api_analytics', {'zone': zone, 'sort': sort})
+    etag = response_cache.etag(key, version, current_user.id)
+    if not_modified(etag):
+        return conditional(make_response('', 304), etag)
+
+    rows = response_cache.get_or_build(key, version, lambda: analytics_rows(zone, sort))
+    return conditional(jsonify(vendors=rows), etag)
+
+# The trends page keeps this many days of daily points in browser storage;
+# longer windows, up to TRENDS_MAX_DAYS, are drawn from the rollups
+TRENDS_SYNC_DAYS = 365
+TRENDS_MAX_DAYS = 5 * 365
 
 @app.route('/trends')
 @login_required
 def trends():
     time_window = request.args.get('time_window', '90')  # Default to 90 days
-    days_ago = datetime.now().date() - timedelta(days=int(time_window))
+    max_points = request.args.get('max_points', type=int)
+    is_xhr = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    payload_format = request.args.get('format') if is_xhr else 'page'
+    today = datetime.now().date()
+    version = current_data_version()
+    # The page only lists the vendors; its chart data comes from /api/trends/delta and the XHR payload
+    params = {'today': today, 'format': payload_format}
+    if is_xhr:
+        params.update(time_window=time_window, max_points=max_points)
+    key = response_cache.key('trends', params)
+    etag = response_cache.etag(key, version, current_user.id)
+    if not_modified(etag):
+        return conditional(make_response('', 304), etag)
+
+    if is_xhr:
+        payload = response_cache.get_or_build(key, version, lambda: trends_payload(today, int(time_window), max_points, payload_format))
+        response = jsonify(payload)
+    else:
+        vendors = response_cache.get_or_build(key, version, lambda: trends_vendors(today - timedelta(days=TRENDS_MAX_DAYS)))
+        response = make_response(render_template('trends.html', vendors=vendors, sync_days=TRENDS_SYNC_DAYS))
+    return conditional(response, etag)
+
+def trends_vendors(start):
+    """The vendors priced since start as {'id', 'name', 'zone'}, in chart legend order."""
+    priced = select(PriceData.id).where(PriceData.vendor_id == Vendor.id, PriceData.date >= start).exists()
+    query = select(Vendor.id, Vendor.name, Vendor.zone).where(priced).order_by(Vendor.name, Vendor.zone, Vendor.id)
+    return [{'id': row.id, 'name': row.name, 'zone': row.zone} for row in read_db.session.execute(query)]
+
+@app.route('/api/trends/delta')
+@login_required
+def trends_delta_api():
+    """Vendor and federal price points written after a data version, for the trends page to merge.
+
+    since is the data version the client's copy was synced to. 0, or a
+    version this server has not reached, gets every point of the last
+    TRENDS_SYNC_DAYS days with full set, and the client starts over. The
+    points are a columnar payload keyed by vendor id, with the version to
+    pass as since next time.
+    """
+    try:
+        since = int(request.args.get('since') or 0)
+    except ValueError:
+        return jsonify(success=False, message="since must be an integer"), 400
+    today = datetime.now().date()
+    version = current_data_version()
+    if since <= 0 or since > version:
+        since = None
+    key = response_cache.key('trends_delta', {'today': today, 'since': since})
+    etag = response_cache.etag(key, version, current_user.id)
+    if not_modified(etag):
+        return conditional(make_response('', 304), etag)
+
+    payload = response_cache.get_or_build(key, version, lambda: trends_delta(today, since, version))
+    return conditional(jsonify(payload), etag)
+
+def trends_delta(today, since, version):
+    start = today - timedelta(days=TRENDS_SYNC_DAYS)
+    vendors = {}
+    if since != version:
+        query = (
+            select(PriceData.vendor_id, PriceData.date, PriceData.price)
+            .where(PriceData.date >= start)
+            .order_by(PriceData.vendor_id, PriceData.date)
+        )
+        if since is not None:
+            query = query.where(PriceData.version > since)
+        for row in read_db.session.execute(query):
+            days, prices = vendors.setdefault(str(row.vendor_id), ([], []))
+            days.append(epoch_day(row.date))
+            prices.append(float(row.price))
+        federal = federal_series(start, since=since)
+    else:
+        federal = ([], [])
+
+    logger.info(f"Trends delta since version {since}: {sum(len(days) for days, _ in vendors.values())} vendor points, {len(federal[0])} federal points")
+    payload = columnar_payload(vendors, federal)
+    payload['version'] = version
+    payload['full'] = since is None
+    payload['start'] = epoch_day(start)
+    return payload
 
-    # Query to get price data for all vendors within the specified time window
+def trends_payload(today, time_window, max_points, payload_format):
+    days_ago = today - timedelta(days=time_window)
+
+    # Long windows read coarser rollup buckets so the point count stays flat
+    granularity = choose_granularity(time_window)
+    # The columnar format keys series by vendor id; the legacy format keeps its vendor name keys
+    by_id = payload_format == 'columnar'
     query = (
-        select(Vendor.name, PriceData.date, PriceData.price)
+        select(Vendor.id, Vendor.name, VendorPriceRollup.bucket, VendorPriceRollup.mean_price)
         .select_from(Vendor)
-        .join(PriceData, Vendor.id == PriceData.vendor_id)
-        .where(PriceData.date >= days_ago)
-        .order_by(Vendor.name, PriceData.date)
+        .join(VendorPriceRollup, Vendor.id == VendorPriceRollup.vendor_id)
+        .where(
+            VendorPriceRollup.granularity == granularity,
+            VendorPriceRollup.bucket >= bucket_start(days_ago, granularity),
+        )
+        .order_by(Vendor.id if by_id else Vendor.name, VendorPriceRollup.bucket)
     )
 
-    results = db.session.execute(query).fetchall()
+    results = read_db.session.execute(query).fetchall()
 
-    # Process the data for the chart
+    # Process the data for the chart as (epoch days, prices) per vendor
     vendors = {}
     for row in results:
-        vendor_name = row.name
-        if vendor_name not in vendors:
-            vendors[vendor_name] = {'dates': [], 'prices': []}
-        vendors[vendor_name]['dates'].append(row.date.strftime('%Y-%m-%dT08:00:00Z'))
-        #vendors[vendor_name]['dates'].append(row.date.strftime('%Y-%m-%d'))
-        vendors[vendor_name]['prices'].append(float(row.price))
+        vendor_key = str(row.id) if by_id else row.name
+        if vendor_key not in vendors:
+            vendors[vendor_key] = ([], [])
+        vendors[vendor_key][0].append(epoch_day(row.bucket))
+        vendors[vendor_key][1].append(float(row.mean_price))
 
     # Fetch federal price data for the specified time window
-    federal_data = FederalPriceData.query.filter(FederalPriceData.date >= days_ago).order_by(FederalPriceData.date).all()
-    federal_prices = {
-        'dates': [data.date.strftime('%Y-%m-%d') for data in federal_data],
-        'prices': [float(data.price) for data in federal_data]
-    }
-    
-    logger.info(f"Trends page accessed. Vendor data points: {sum(len(v['dates']) for v in vendors.values())}, Federal data points: {len(federal_data)}")
+    federal = federal_series(days_ago)
+
+    # Shape-preserving downsampling of each series to at most max_points
+    if max_points:
+        vendors = {name: downsample(days, prices, max_points) for name, (days, prices) in vendors.items()}
+        federal = downsample(*federal, max_points)
+
+    logger.info(f"Trends data built. Granularity: {granularity}, Vendor data points: {sum(len(days) for days, _ in vendors.values())}, Federal data points: {len(federal[0])}")
 
-    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        return jsonify({'vendors': vendors, 'federal_prices': federal_prices})
+    if payload_format == 'columnar':
+        payload = columnar_payload(vendors, federal)
     else:
-        return render_template('trends.html', vendors=vendors, federal_prices=federal_prices)
+        payload = legacy_payload(vendors, federal)
+    payload['granularity'] = granularity
+    return payload
+
+def federal_series(start, end=None, since=None):
+    """The charted EIA series from start (through end, if given) as (epoch days, prices).
+
+    With since, only the points written after that data version.
+    """
+    query = (
+        select(FederalPriceData.date, FederalPriceData.price)
+        .join(FederalSeries)
+        .where(FederalSeries.code == app.config['EIA_SERIES'][0], FederalPriceData.date >= start)
+        .order_by(FederalPriceData.date)
+    )
+    if end is not None:
+        query = query.where(FederalPriceData.date <= end)
+    if since is not None:
+        query = query.where(FederalPriceData.version > since)
+    federal_data = read_db.session.execute(query).all()
+    return [epoch_day(row.date) for row in federal_data], [float(row.price) for row in federal_data]
+
+def date_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+def int_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < 1:
+        raise ValueError(f"{name} must be positive")
+    return number
+
+@app.route('/api/prices/series')
+@login_required
+def price_series_api():
+    """Daily price series as a columnar payload keyed by vendor id.
+
+    Query parameters: start and end (YYYY-MM-DD, default the last 90 days),
+    vendor_id (repeated or comma separated), zone, top_n with rank_by
+    'latest' or 'average' to keep only the cheapest vendors, max_points, and
+    federal=0 to leave out the federal series.
+    """
+    today = datetime.now().date()
+    try:
+        end = date_arg('end', today)
+        start = date_arg('start', end - timedelta(days=90))
+        if start > end:
+            raise ValueError("start must not be after end")
+        vendor_ids = sorted({int(value) for arg in request.args.getlist('vendor_id') for value in arg.split(',') if value}) or None
+        top_n = int_arg('top_n')
+        max_points = int_arg('max_points')
+        rank_by = request.args.get('rank_by') or 'latest'
+        if rank_by not in RANK_BY:
+            raise ValueError(f"rank_by must be one of {', '.join(RANK_BY)}")
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
+    zone = request.args.get('zone') or None
+    include_federal = request.args.get('federal', '1') != '0'
+
+    version = current_data_version()
+    key = response_cache.key('api_series', {
+        'today': today,
+        'start': start,
+        'end': end,
+        'vendor_ids': vendor_ids,
+        'zone': zone,
+        'top_n': top_n,
+        'rank_by': rank_by,
+        'max_points': max_points,
+        'federal': include_federal,
+    })
+    etag = response_cache.etag(key, version, current_user.id)
+    if not_modified(etag):
+        return conditional(make_response('', 304), etag)
+
+    def build():
+        rank_prices = {}
+        selected = vendor_ids
+        if top_n:
+            ranked = rank_vendors(start, end, top_n, rank_by, vendor_ids, zone, today)
+            rank_prices = dict(ranked)
+            selected = [vendor_id for vendor_id, _ in ranked]
+        series = price_series(start, end, selected, zone)
+        federal = federal_series(start, end) if include_federal else ([], [])
+        if max_points:
+            series = {vendor_id: downsample(days, prices, max_points) for vendor_id, (days, prices) in series.items()}
+            federal = downsample(*federal, max_points)
+
+        vendors = read_db.session.execute(select(Vendor).where(Vendor.id.in_(list(series)))).scalars().all()
+        if top_n:
+            vendors.sort(key=lambda vendor: selected.index(vendor.id))
+        else:
+            vendors.sort(key=lambda vendor: (vendor.name, vendor.id))
+
+        payload = columnar_payload({str(vendor_id): points for vendor_id, points in series.items()}, federal)
+        if not include_federal:
+            del payload['federal']
+        payload['start'] = start.isoformat()
+        payload['end'] = end.isoformat()
+        payload['selected'] = [
+            {
+                'id': vendor.id,
+                'name': vendor.name,
+                'town': vendor.town,
+                'zone': vendor.zone,
+                'rank_price': rank_prices.get(vendor.id),
+            }
+            for vendor in vendors
+        ]
+        return payload
+
+    payload = response_cache.get_or_build(key, version, build)
+    return conditional(jsonify(payload), etag)
+
+@app.route('/export/<dataset>')
+@login_required
+def export_data(dataset):
+    """Download a dataset ('prices' or 'federal') as CSV or NDJSON, streamed as it is read."""
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') == '1'
+    if dataset not in COLUMNS or fmt not in FORMATS:
+        return jsonify(success=False, message="Unknown dataset or format"), 404
+    try:
+        start = date_arg('start', None)
+        end = date_arg('end', None)
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
+
+    filename = f"etrends-{dataset}-{datetime.now():%Y%m%d}.{fmt}{'.gz' if compress else ''}"
+    response = Response(
+        stream_with_context(export(dataset, fmt, start, end, compress)),
+        mimetype='application/gzip' if compress else FORMATS[fmt],
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    logger.info(f"Export of {dataset} as {fmt} started by user {current_user.username}")
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request and job metrics of all workers, for Prometheus to scrape."""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(401)
+    if not metrics.enabled:
+        abort(503)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def start_scheduler_leader():
+    """Join the scheduler election, in served processes only.
+
+    Called by gunicorn's post_worker_init hook (gunicorn.conf.py), never on
+    import, so flask CLI commands don't take the lock and run jobs.
+    """
+    if app.config['SCHEDULER_ENABLED']:
+        leader.start()
 
 if __name__ == '__main__':
+    # In debug mode only the reloader's child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_scheduler_leader()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""Content-addressed archive of the raw pages and API responses scrapes download.
+
+Each distinct body is stored once, gzip compressed, under its SHA-256:
+<root>/ab/cd/abcd....gz. ScrapeArtifact rows record which body a zone or
+series fetch returned and link it to the run's ScrapeLog, so the archive
+can be parsed again (`flask reparse-archive`) after a parser fix without
+touching the network.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that carry credentials and are never stored
+SECRET_PARAMS = {'api_key'}
+
+def redact_url(url):
+    """url without its SECRET_PARAMS query parameters."""
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name not in SECRET_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+class PageArchive:
+    def __init__(self, root, compresslevel=6):
+        self.root = root
+        self.compresslevel = compresslevel
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.gz")
+
+    def put(self, content):
+        """Store content unless an identical body is already archived. Returns its SHA-256 hex digest."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Written to a temporary name and renamed, so a reader never sees half a blob
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(content, compresslevel=self.compresslevel, mtime=0))
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return digest
+
+    def get(self, digest):
+        with open(self.path(digest), 'rb') as f:
+            return gzip.decompress(f.read())
+
+def archive_response(archive, source, key, response, artifacts):
+    """Store a response body and append its ScrapeArtifact row to artifacts.
+
+    A failure to archive is logged rather than raised, so it never costs a scrape.
+    """
+    try:
+        digest = archive.put(response.content)
+    except OSError as e:
+        logger.warning(f"Could not archive {source} response for {key}: {str(e)}")
+        return
+    artifacts.append({
+        'source': source,
+        'key': key,
+        'url': redact_url(response.url),
+        'sha256': digest,
+        'size': len(response.content),
+        'fetched_at': datetime.now(),
+    })
+
+# Set up once per worker process by reparse()
+_parser = None
+_archive = None
+
+def _init_worker(root, parser):
+    global _parser, _archive
+    from scraper import Scraper
+    _parser = Scraper(parser=parser)
+    _archive = PageArchive(root)
+
+def _parse_page(task):
+    digest, zone = task
+    try:
+        return _parser.extract(_archive.get(digest), zone), None
+    except Exception as e:
+        return [], f"{digest[:12]} ({zone}): {str(e)}"
+
+def reparse(archive, pages, parser='auto', workers=None, chunksize=8):
+    """Parse archived price pages, an iterable of (digest, zone), across processes.
+
+    Yields (records, error) per page in the order the pages were given:
+    the page's (zone, company, town, price, date) records, and an error
+    message if it could not be read or parsed.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(archive.root, parser)) as pool:
+        yield from pool.map(_parse_page, pages, chunksize=chunksize)
@@ -0,0 +1,105 @@
+"""Fill a database with synthetic vendors, daily prices and federal series.
+
+    python -m benchmarks.datagen --database sqlite:////tmp/bench.db --vendors 500 --years 10
+
+Vendors are named and zoned like benchmarks.stubs' generated pages, and the
+federal series match EIAStub, so a scrape or federal fetch against the
+stubs lands on the same rows. Rollups, LatestPrice and analytics
+are rebuilt at the end.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.stubs import weekly_series
+
+def zone_names(zones):
+    return [f"bench/zone{i}" for i in range(zones)]
+
+def generate(vendors=500, years=10, zones=10, density=0.8, series=None, seed=0, batch_size=50000):
+    """Write the synthetic data through the app's models; needs an app context. Returns row counts."""
+    from models import db, Vendor, PriceData, FederalSeries, FederalPriceData
+    from rollups import rebuild_rollups
+    from latest import rebuild_latest_prices
+    from analytics import refresh_analytics
+
+    rng = random.Random(seed)
+    zone_list = zone_names(zones)
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+    days = (end - start).days + 1
+
+    db.session.execute(db.insert(Vendor), [
+        {'id': i + 1, 'name': f"Vendor {i:04d}", 'town': f"Town {i % 12}", 'zone': zone_list[i % zones]}
+        for i in range(vendors)
+    ])
+
+    prices = 0
+    rows = []
+    for i in range(vendors):
+        base = 2.6 + rng.random()
+        phase = rng.random() * math.tau
+        for d in range(days):
+            # Vendors don't post every day; the most recent day always has a price
+            if d != days - 1 and rng.random() > density:
+                continue
+            price = base + 0.6 * math.sin(d / 180 + phase) + rng.uniform(-0.05, 0.05)
+            rows.append({'vendor_id': i + 1, 'date': start + timedelta(days=d), 'price': round(price, 3)})
+            if len(rows) >= batch_size:
+                db.session.execute(db.insert(PriceData), rows)
+                prices += len(rows)
+                rows = []
+    if rows:
+        db.session.execute(db.insert(PriceData), rows)
+        prices += len(rows)
+
+    federal = 0
+    for code in series or []:
+        federal_series = FederalSeries(code=code)
+        db.session.add(federal_series)
+        db.session.flush()
+        points = [
+            {'series_id': federal_series.id, 'date': date.fromisoformat(point['period']), 'price': float(point['value'])}
+            for point in weekly_series(code, end=end)
+            if point['period'] >= start.isoformat()
+        ]
+        db.session.execute(db.insert(FederalPriceData), points)
+        federal += len(points)
+    db.session.commit()
+
+    rebuild_latest_prices()
+    rebuild_rollups()
+    refresh_analytics(series[0] if series else None)
+    db.session.commit()
+    return {'vendors': vendors, 'zones': zones, 'prices': prices, 'federal_prices': federal}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', required=True, help='SQLAlchemy URL of an empty database.')
+    parser.add_argument('--vendors', type=int, default=500)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--zones', type=int, default=10)
+    parser.add_argument('--density', type=float, default=0.8, help='Share of days each vendor posts a price.')
+    parser.add_argument('--series', default='W_EPD2F_PRS_SRI_DPG', help='Comma separated EIA series codes.')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database
+    os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+    # Keep the app's side stores out of the instance folder
+    workdir = tempfile.mkdtemp(prefix='etrends-datagen-')
+    for name, filename in (('CACHE_PATH', 'cache.db'), ('METRICS_PATH', 'metrics.db'), ('ARCHIVE_DIR', 'archive')):
+        os.environ.setdefault(name, os.path.join(workdir, filename))
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        counts = generate(args.vendors, args.years, args.zones, args.density, args.series.split(','))
+        counts['seconds'] = round(time.perf_counter() - started, 1)
+    print(json.dumps(counts, indent=2))
@@ -0,0 +1,160 @@
+"""Reader latency on SQLite while an ingest is writing, with and without the tuned pragmas.
+
+    python -m benchmarks.sqlite_concurrency --readers 4 --duration 10
+
+For each mode a fresh database is seeded, then one writer process upserts
+batches of prices in long transactions (like a scrape or import) while
+reader processes run the /prices and /trends queries in a loop, as the
+other gunicorn workers would. 'default' is a plain SQLite connection with
+a rollback journal; 'tuned' applies the pragmas from Config. Prints JSON
+with reader latency percentiles, throughput and errors per mode.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import Config
+from database import sqlite_pragmas, apply_pragmas
+from models import db, Vendor, PriceData, LatestPrice, VendorPriceRollup
+
+def make_engine(path, mode, read_only=False):
+    engine = create_engine(f"sqlite:///{path}")
+    if mode == 'tuned':
+        pragmas = sqlite_pragmas(vars(Config))
+        apply_pragmas(engine, dict(pragmas, query_only=1) if read_only else pragmas)
+    return engine
+
+def seed(path, mode, vendors, days):
+    engine = make_engine(path, mode)
+    db.metadata.create_all(engine)
+    rng = random.Random(0)
+    start = date.today() - timedelta(days=days)
+    with engine.begin() as conn:
+        conn.execute(insert(Vendor), [{'id': v, 'name': f"Vendor {v}", 'town': 'Town', 'zone': 'bench/zone1'} for v in range(1, vendors + 1)])
+        conn.execute(insert(PriceData), [
+            {'vendor_id': v, 'date': start + timedelta(days=d), 'price': round(3 + rng.random(), 3)}
+            for v in range(1, vendors + 1) for d in range(days)
+        ])
+        conn.execute(insert(LatestPrice), [
+            {'vendor_id': v, 'price': round(3 + rng.random(), 3), 'date': start + timedelta(days=days - 1)}
+            for v in range(1, vendors + 1)
+        ])
+        conn.execute(insert(VendorPriceRollup), [
+            {'vendor_id': v, 'granularity': 'day', 'bucket': start + timedelta(days=d),
+             'min_price': 3.0, 'max_price': 3.0, 'mean_price': 3.0, 'count': 1}
+            for v in range(1, vendors + 1) for d in range(days)
+        ])
+    engine.dispose()
+
+def writer(path, mode, vendors, stop_at, batch, results):
+    engine = make_engine(path, mode)
+    rng = random.Random(1)
+    commits = 0
+    errors = 0
+    day = date.today()
+    while time.time() < stop_at:
+        rows = [
+            {'vendor_id': 1 + i % vendors, 'date': day + timedelta(days=i // vendors), 'price': round(3 + rng.random(), 3)}
+            for i in range(batch)
+        ]
+        day += timedelta(days=batch // vendors + 1)
+        stmt = sqlite_insert(PriceData.__table__)
+        stmt = stmt.on_conflict_do_update(index_elements=['vendor_id', 'date'], set_={'price': stmt.excluded.price})
+        try:
+            with engine.begin() as conn:
+                conn.execute(stmt, rows)
+                # Derived-table refreshes keep the write transaction open a while longer
+                time.sleep(0.2)
+            commits += 1
+        except Exception:
+            errors += 1
+    results.put(('writer', commits, errors))
+
+def reader(path, mode, days, stop_at, results):
+    engine = make_engine(path, mode, read_only=True)
+    since = date.today() - timedelta(days=min(days, 30))
+    prices = (
+        select(Vendor.name, LatestPrice.price, LatestPrice.date)
+        .join(Vendor, Vendor.id == LatestPrice.vendor_id)
+        .order_by(LatestPrice.price)
+    )
+    trends = (
+        select(Vendor.name, VendorPriceRollup.bucket, VendorPriceRollup.mean_price)
+        .join(VendorPriceRollup, Vendor.id == VendorPriceRollup.vendor_id)
+        .where(VendorPriceRollup.granularity == 'day', VendorPriceRollup.bucket >= since)
+    )
+    latencies = []
+    errors = 0
+    while time.time() < stop_at:
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(prices).all()
+                conn.execute(trends).all()
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+    results.put(('reader', latencies, errors))
+
+def run(mode, readers, duration, vendors, days, batch):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.db')
+    seed(path, mode, vendors, days)
+
+    results = multiprocessing.Queue()
+    stop_at = time.time() + duration
+    processes = [multiprocessing.Process(target=writer, args=(path, mode, vendors, stop_at, batch, results))]
+    processes += [multiprocessing.Process(target=reader, args=(path, mode, days, stop_at, results)) for _ in range(readers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = sorted(latency for kind, values, _ in outcomes if kind == 'reader' for latency in values)
+    commits = sum(values for kind, values, _ in outcomes if kind == 'writer')
+    reader_errors = sum(errors for kind, _, errors in outcomes if kind == 'reader')
+    writer_errors = sum(errors for kind, _, errors in outcomes if kind == 'writer')
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+    return {
+        'reads': len(latencies),
+        'reads_per_sec': round(len(latencies) / duration, 1),
+        'read_p50_ms': percentile(0.5),
+        'read_p99_ms': percentile(0.99),
+        'read_max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'read_mean_ms': round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        'reader_errors': reader_errors,
+        'writer_commits': commits,
+        'writer_errors': writer_errors,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--vendors', type=int, default=200)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--batch', type=int, default=100000, help='Price rows per write transaction.')
+    parser.add_argument('--modes', default='default,tuned')
+    args = parser.parse_args()
+
+    report = {
+        mode: run(mode, args.readers, args.duration, args.vendors, args.days, args.batch)
+        for mode in args.modes.split(',')
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
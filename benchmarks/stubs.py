@@ -0,0 +1,163 @@
+"""Local HTTP stand-ins for the external data sources.
+
+Run ``python -m benchmarks.stubs`` and point the app at it with
+``EIA_API_URL=http://127.0.0.1:8765/v2`` and
+``SCRAPE_BASE_URL=http://127.0.0.1:8765`` to develop and test without
+touching api.eia.gov or newenglandoil.com.
+"""
+import argparse
+import html
+import json
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+def weekly_series(code, start=date(2015, 1, 5), end=None):
+    """Deterministic weekly price history for a series code, oldest first."""
+    end = end or date.today()
+    seed = sum(ord(c) for c in code)
+    points = []
+    day = start
+    week = 0
+    while day <= end:
+        price = 3.0 + ((seed + week * 7) % 150) / 100
+        points.append({'period': day.isoformat(), 'series': code, 'value': f"{price:.3f}"})
+        day += timedelta(weeks=1)
+        week += 1
+    return points
+
+class EIAStub:
+    """Serves the subset of the EIA v2 /data/ endpoint that FederalFetcher uses."""
+
+    def __init__(self, end=None):
+        self.end = end
+        self.requests = []  # query dicts of every request received, for assertions
+        self.series = {}
+
+    def points(self, code):
+        if code not in self.series:
+            self.series[code] = weekly_series(code, end=self.end)
+        return self.series[code]
+
+    def respond(self, query):
+        self.requests.append(query)
+        codes = query.get('facets[series][]', [])
+        points = [point for code in codes for point in self.points(code)]
+        if 'start' in query:
+            points = [point for point in points if point['period'] >= query['start'][0]]
+        if query.get('sort[0][direction]', ['asc'])[0] == 'desc':
+            points = points[::-1]
+        offset = int(query.get('offset', ['0'])[0])
+        length = int(query.get('length', ['5000'])[0])
+        return {'response': {'total': str(len(points)), 'data': points[offset:offset + length]}}
+
+def zone_vendors(zone_index, vendors, zones):
+    """Names of the synthetic vendors in a zone; benchmarks.datagen uses the same scheme."""
+    return [f"Vendor {i:04d}" for i in range(zone_index, vendors, zones)]
+
+def zone_page(zone, names, day, revision=0):
+    """A price page laid out like newenglandoil.com's: the first table holds the prices."""
+    seed = sum(ord(c) for c in zone) + revision * 31
+    rows = []
+    for i, name in enumerate(names):
+        price = 2.8 + ((seed + i * 17) % 120) / 100
+        rows.append(
+            f"<tr><td><a href=\"/vendor.asp?id={i}\">{html.escape(name)}</a></td><td>Town {i % 12}</td>"
+            f"<td>${price:.3f}</td><td>(401) 555-{i:04d}</td><td>{day:%m/%d/%Y}</td><td>&nbsp;</td></tr>"
+        )
+    return (
+        "<html><head><meta charset=\"utf-8\"><title>Heating Oil Prices</title></head><body>"
+        "<table class=\"prices\"><tr><th>Company</th><th>Town</th><th>Price</th><th>Phone</th><th>Date</th><th></th></tr>"
+        + "\n".join(rows)
+        + "</table><table><tr><td>Advertisement</td></tr></table></body></html>"
+    ).encode()
+
+class OilStub:
+    """Serves zone pages at /<state>/<zone>.asp, with ETags so conditional requests get 304s.
+
+    Pages come from pages_dir (saved pages named <state>_<zone>.html) when
+    one is given and holds the zone, otherwise they are generated for the
+    synthetic vendors of the zone. advance() changes every generated page.
+    """
+
+    def __init__(self, zones, vendors=500, pages_dir=None, day=None):
+        self.zones = list(zones)
+        self.vendors = vendors
+        self.pages_dir = pages_dir
+        self.day = day or date.today()
+        self.revision = 0
+        self.requests = []
+
+    def advance(self):
+        self.revision += 1
+
+    def page(self, zone):
+        if self.pages_dir:
+            path = os.path.join(self.pages_dir, zone.replace('/', '_') + '.html')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return f.read(), f'"{os.path.getmtime(path)}"'
+        if zone not in self.zones:
+            return None, None
+        names = zone_vendors(self.zones.index(zone), self.vendors, len(self.zones))
+        return zone_page(zone, names, self.day, self.revision), f'"{zone}-{self.revision}"'
+
+def make_handler(eia, oil=None):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            etag = None
+            if url.path.startswith('/v2/') and url.path.endswith('/data/'):
+                body = json.dumps(eia.respond(parse_qs(url.query))).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+            elif oil is not None and url.path.endswith('.asp'):
+                oil.requests.append(url.path)
+                body, etag = oil.page(url.path[1:-len('.asp')])
+                if body is None:
+                    body = b'not found'
+                    self.send_response(404)
+                elif etag == self.headers.get('If-None-Match'):
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                else:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/html')
+                    self.send_header('ETag', etag)
+            else:
+                body = b'not found'
+                self.send_response(404)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+def start(eia=None, oil=None, host='127.0.0.1', port=0):
+    """Serve the stubs on a background thread. Returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(eia or EIAStub(), oil))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--zones', default='rhodeisland/zone4', help='Comma separated zones to generate pages for.')
+    parser.add_argument('--vendors', type=int, default=40, help='Synthetic vendors spread across the zones.')
+    parser.add_argument('--pages', help='Directory of saved pages named <state>_<zone>.html to serve instead.')
+    args = parser.parse_args()
+    oil = OilStub(args.zones.split(','), vendors=args.vendors, pages_dir=args.pages)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(EIAStub(), oil))
+    print(f"EIA stub listening on http://{args.host}:{args.port}/v2")
+    print(f"Zone pages at http://{args.host}:{args.port}/<state>/<zone>.asp")
+    server.serve_forever()
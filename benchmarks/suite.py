@@ -0,0 +1,169 @@
+"""End-to-end benchmarks of the hot paths against local stand-ins.
+
+    python -m benchmarks.suite --vendors 500 --years 10 --output results.json
+    python -m benchmarks.suite --vendors 100 --years 2 --compare results.json
+
+Builds a scratch database with benchmarks.datagen, serves zone pages and
+the EIA API from benchmarks.stubs, then times Scraper.scrape,
+fetch_federal_data, the /prices and /trends views and the trends delta
+sync through the test client. Results are written as JSON; with
+--compare, any timing that got slower than --threshold percent versus an
+earlier run is reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import stubs
+from benchmarks.datagen import generate, zone_names
+
+TREND_WINDOWS = (30, 90, 365, 1825, 3650)
+
+def timed(fn, repeat, setup=None):
+    """Run fn repeat times and summarise the wall time in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'min_ms': round(samples[0], 2),
+        'median_ms': round(statistics.median(samples), 2),
+        'max_ms': round(samples[-1], 2),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(vendors=500, years=10, zones=10, repeat=5):
+    workdir = tempfile.mkdtemp(prefix='etrends-bench-')
+    zone_list = zone_names(zones)
+    eia = stubs.EIAStub()
+    oil = stubs.OilStub(zone_list, vendors=vendors)
+    _, base_url = stubs.start(eia, oil)
+
+    # The app reads its configuration at import time
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'CACHE_PATH': os.path.join(workdir, 'cache.db'),
+        'METRICS_PATH': os.path.join(workdir, 'metrics.db'),
+        'ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+        'SCHEDULER_LOCK_PATH': os.path.join(workdir, 'scheduler.lock'),
+        'SCHEDULER_ENABLED': 'false',
+        'SCRAPE_BASE_URL': base_url,
+        'SCRAPE_ZONES': ','.join(zone_list),
+        'EIA_API_URL': f"{base_url}/v2",
+    })
+    import logging
+    logging.disable(logging.INFO)
+    from werkzeug.security import generate_password_hash
+    from app import app, scraper, fetch_federal_data
+    from models import db, User, bump_data_version
+
+    results = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'scale': {'vendors': vendors, 'years': years, 'zones': zones, 'repeat': repeat},
+        'timings': {},
+    }
+    timings = results['timings']
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', password_hash=generate_password_hash('bench')))
+        db.session.commit()
+        started = time.perf_counter()
+        results['data'] = generate(vendors, years, zones, series=app.config['EIA_SERIES'])
+        results['data']['seconds'] = round(time.perf_counter() - started, 1)
+
+        # Every page changed since the last scrape, then nothing changed (all 304s)
+        timings['scrape_changed'] = timed(scraper.scrape, repeat, setup=oil.advance)
+        timings['scrape_unchanged'] = timed(scraper.scrape, repeat)
+        timings['federal_incremental'] = timed(fetch_federal_data, repeat)
+        timings['federal_full'] = timed(lambda: fetch_federal_data(full=True), repeat)
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'bench', 'password': 'bench'})
+
+    def get(url, **kwargs):
+        def request():
+            response = client.get(url, **kwargs)
+            assert response.status_code in (200, 304), f"{url} returned {response.status_code}"
+        return request
+
+    # Bumping the data version misses the response cache on the next request
+    def uncached():
+        with app.app_context():
+            bump_data_version()
+            db.session.commit()
+
+    timings['prices_uncached'] = timed(get('/prices'), repeat, setup=uncached)
+    timings['prices_cached'] = timed(get('/prices'), repeat)
+    for window in TREND_WINDOWS:
+        page = get(f'/trends?time_window={window}')
+        xhr = get(
+            f'/trends?time_window={window}&format=columnar&max_points=300',
+            headers={'X-Requested-With': 'XMLHttpRequest'},
+        )
+        timings[f'trends_{window}d_page_uncached'] = timed(page, repeat, setup=uncached)
+        timings[f'trends_{window}d_page_cached'] = timed(page, repeat)
+        timings[f'trends_{window}d_xhr_uncached'] = timed(xhr, repeat, setup=uncached)
+        timings[f'trends_{window}d_xhr_cached'] = timed(xhr, repeat)
+    # First visit to the trends page: a full sync of the stored range
+    delta = get('/api/trends/delta?since=0')
+    timings['trends_delta_full_uncached'] = timed(delta, repeat, setup=uncached)
+    timings['trends_delta_full_cached'] = timed(delta, repeat)
+    return results
+
+def compare(current, previous, threshold):
+    """Timings whose median grew more than threshold percent, as {name: (before, after)}."""
+    regressions = {}
+    for name, timing in current['timings'].items():
+        before = previous.get('timings', {}).get(name)
+        if before and timing['median_ms'] > before['median_ms'] * (1 + threshold / 100):
+            regressions[name] = (before['median_ms'], timing['median_ms'])
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vendors', type=int, default=500)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--zones', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Write the results JSON here (default: stdout).')
+    parser.add_argument('--compare', help='Results JSON of an earlier run to check for regressions.')
+    parser.add_argument('--threshold', type=float, default=20, help='Slowdown in percent counted as a regression.')
+    args = parser.parse_args()
+
+    results = run(args.vendors, args.years, args.zones, args.repeat)
+    body = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(body + '\n')
+    else:
+        print(body)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous.get('scale') != results['scale']:
+            print(f"warning: comparing against a run at a different scale {previous.get('scale')}", file=sys.stderr)
+        regressions = compare(results, previous, args.threshold)
+        for name, (before, after) in regressions.items():
+            print(f"REGRESSION {name}: {before:.1f} ms -> {after:.1f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,64 @@
+"""Compare the legacy and columnar /trends payloads on synthetic series.
+
+    python -m benchmarks.trends_payload --vendors 300 --days 365 --max-points 150
+
+Prints JSON with the encoded size, gzipped size and build+encode time of
+each format, with and without LTTB downsampling.
+"""
+import argparse
+import gzip
+import json
+import math
+import random
+import time
+from datetime import date
+
+from charts import epoch_day, downsample, legacy_payload, columnar_payload
+
+def synthetic_series(vendors, days, seed=0):
+    rng = random.Random(seed)
+    end = epoch_day(date.today())
+    series = {}
+    for v in range(vendors):
+        base = 3.0 + rng.random()
+        day_list = [end - days + d for d in range(days + 1) if rng.random() < 0.8]
+        prices = [round(base + 0.3 * math.sin(day / 40.0 + v) + rng.uniform(-0.05, 0.05), 3) for day in day_list]
+        series[f"Vendor {v}"] = (day_list, prices)
+    federal_days = [end - days + d for d in range(0, days + 1, 7)]
+    federal = (federal_days, [round(3.5 + 0.2 * math.sin(day / 50.0), 3) for day in federal_days])
+    return series, federal
+
+def measure(build, vendors, federal, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = json.dumps(build(vendors, federal), separators=(',', ':')).encode()
+    elapsed = (time.perf_counter() - start) / repeat
+    return {
+        'bytes': len(body),
+        'gzip_bytes': len(gzip.compress(body)),
+        'encode_ms': round(elapsed * 1000, 2),
+    }
+
+def run(vendors=300, days=365, max_points=150, repeat=5):
+    series, federal = synthetic_series(vendors, days)
+    sampled = {name: downsample(d, p, max_points) for name, (d, p) in series.items()}
+    sampled_federal = downsample(*federal, max_points)
+    return {
+        'vendors': vendors,
+        'days': days,
+        'max_points': max_points,
+        'points': sum(len(d) for d, _ in series.values()),
+        'legacy': measure(legacy_payload, series, federal, repeat),
+        'columnar': measure(columnar_payload, series, federal, repeat),
+        'legacy_downsampled': measure(legacy_payload, sampled, sampled_federal, repeat),
+        'columnar_downsampled': measure(columnar_payload, sampled, sampled_federal, repeat),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vendors', type=int, default=300)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--max-points', type=int, default=150)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.vendors, args.days, args.max_points, args.repeat), indent=2))
@@ -0,0 +1,106 @@
+"""Response data cache shared across worker processes, invalidated by the data version.
+
+Entries are keyed by build, view name and parameters and tagged with the
+DataVersion counter they were built at. Every successful ingest bumps that
+counter, so an entry is served exactly until new data lands; a deploy
+changes the build salt, so it is never served by code expecting another shape.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from flask import request
+from localstore import connect
+
+logger = logging.getLogger(__name__)
+
+def source_digest(root):
+    """Digest of the Python sources and templates under root, standing in for a build id."""
+    digest = hashlib.sha1()
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d not in ('instance', '__pycache__', 'tests', 'benchmarks'))
+        for name in sorted(files):
+            if name.endswith(('.py', '.html')):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL
+)
+'''
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.path = None
+        self.salt = ''
+        self.max_entries = 500
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.path = app.config.get('CACHE_PATH') or os.path.join(app.instance_path, 'cache.db')
+        self.max_entries = app.config.get('CACHE_MAX_ENTRIES', 500)
+        # A new build retires old payload shapes and ETags, templates included
+        self.salt = app.config.get('CACHE_SALT') or source_digest(app.root_path)
+        connect(self.path).execute(SCHEMA)
+
+    def key(self, name, params):
+        return f"{self.salt}:{name}?{json.dumps(params, sort_keys=True, default=str)}"
+
+    def etag(self, key, version, user_id):
+        # Pages embed the user's name, so one user's copy must never validate for another
+        return hashlib.sha1(f"{key}:{version}:{user_id}".encode()).hexdigest()
+
+    def get(self, key, version):
+        row = connect(self.path).execute(
+            'SELECT payload FROM response_cache WHERE key = ? AND version = ?', (key, version)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, version, payload):
+        conn = connect(self.path)
+        conn.execute(
+            'INSERT OR REPLACE INTO response_cache (key, version, payload, created) VALUES (?, ?, ?, ?)',
+            (key, version, json.dumps(payload, default=str), time.time()),
+        )
+        conn.execute('DELETE FROM response_cache WHERE version < ?', (version,))
+        conn.execute(
+            'DELETE FROM response_cache WHERE key NOT IN '
+            '(SELECT key FROM response_cache ORDER BY created DESC LIMIT ?)',
+            (self.max_entries,),
+        )
+
+    def get_or_build(self, key, version, build):
+        """Return the cached payload for key at version, building and storing it on a miss."""
+        try:
+            payload = self.get(key, version)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {str(e)}")
+            return build()
+        if payload is not None:
+            return payload
+
+        payload = build()
+        try:
+            self.set(key, version, payload)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {str(e)}")
+        return payload
+
+def not_modified(etag):
+    """True when the client already holds the representation tagged etag."""
+    return etag in request.if_none_match
+
+def conditional(response, etag):
+    """Tag a response so the browser revalidates it on every use."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,98 @@
+"""Shaping price series into chart payloads for /trends.
+
+A series is a pair of parallel lists: epoch days (days since 1970-01-01)
+in ascending order and float prices.
+"""
+from datetime import date
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def epoch_day(day):
+    return day.toordinal() - EPOCH_ORDINAL
+
+def from_epoch_day(days):
+    return date.fromordinal(days + EPOCH_ORDINAL)
+
+def lttb(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of at most threshold points that keep the visual
+    shape of the series; the first and last points are always kept.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    indices = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third corner of the triangle
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        count = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / count
+        avg_y = sum(ys[next_start:next_end]) / count
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = xs[a], ys[a]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        indices.append(best)
+        a = best
+    indices.append(n - 1)
+    return indices
+
+def downsample(days, prices, max_points):
+    if not max_points or len(days) <= max_points:
+        return days, prices
+    keep = lttb(days, prices, max_points)
+    return [days[i] for i in keep], [prices[i] for i in keep]
+
+def legacy_payload(vendors, federal):
+    """The original per-series payload of ISO date strings."""
+    return {
+        'vendors': {
+            name: {
+                'dates': [from_epoch_day(day).strftime('%Y-%m-%dT08:00:00Z') for day in days],
+                'prices': prices,
+            }
+            for name, (days, prices) in vendors.items()
+        },
+        'federal_prices': {
+            'dates': [from_epoch_day(day).strftime('%Y-%m-%d') for day in federal[0]],
+            'prices': federal[1],
+        },
+    }
+
+def columnar_payload(vendors, federal):
+    """Every series indexed on one shared epoch-day axis.
+
+    A series covering at least half of the axis is a column aligned with it,
+    with None where it has no point. Sparser series, typically downsampled
+    ones whose kept days differ from their neighbours', are sent as
+    {'i': [axis indices], 'p': [prices]} so they don't ship a column of nulls.
+    """
+    axis = sorted({day for days, _ in vendors.values() for day in days} | set(federal[0]))
+    position = {day: i for i, day in enumerate(axis)}
+
+    def encode(days, prices):
+        if len(days) * 2 < len(axis):
+            return {'i': [position[day] for day in days], 'p': prices}
+        column = [None] * len(axis)
+        for day, price in zip(days, prices):
+            column[position[day]] = price
+        return column
+
+    return {
+        'format': 'columnar',
+        'days': axis,
+        'vendors': {name: encode(days, prices) for name, (days, prices) in vendors.items()},
+        'federal': encode(*federal),
+    }
@@ -4,4 +4,60 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///etrends.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Pragmas set on every SQLite connection; WAL lets readers carry on while a scrape commits
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or 5000)  # milliseconds
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE') or -20000)  # negative means KiB
+    # Read-only views (/prices, /trends, the series API, exports) use their own engine and pool
+    READ_DATABASE_URL = os.environ.get('READ_DATABASE_URL') or SQLALCHEMY_DATABASE_URI
+    READ_POOL_SIZE = int(os.environ.get('READ_POOL_SIZE') or 8)
+    SQLALCHEMY_BINDS = {'read': {'url': READ_DATABASE_URL, 'pool_size': READ_POOL_SIZE}}
     SCHEDULER_API_ENABLED = True
+    # Scheduled jobs run only in the served process holding this lock file (defaults to the instance folder)
+    SCHEDULER_ENABLED = (os.environ.get('SCHEDULER_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    SCHEDULER_LOCK_PATH = os.environ.get('SCHEDULER_LOCK_PATH')
+    SCHEDULER_LEADER_RETRY = int(os.environ.get('SCHEDULER_LEADER_RETRY') or 15)
+    # How often the leader checks the job table for scrapes queued by other workers (seconds)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL') or 2)
+    # Scrape log entries older than this are rolled up into daily summaries each night (0 keeps everything)
+    SCRAPE_LOG_RETENTION_DAYS = int(os.environ.get('SCRAPE_LOG_RETENTION_DAYS') or 90)
+
+    # newenglandoil.com zone pages to scrape, comma separated '<state>/<zone>' paths
+    SCRAPE_ZONES = [zone.strip() for zone in (os.environ.get('SCRAPE_ZONES') or 'rhodeisland/zone4').split(',') if zone.strip()]
+    SCRAPE_BASE_URL = os.environ.get('SCRAPE_BASE_URL') or 'https://www.newenglandoil.com'
+    SCRAPE_MAX_WORKERS = int(os.environ.get('SCRAPE_MAX_WORKERS') or 8)
+    SCRAPE_TIMEOUT = float(os.environ.get('SCRAPE_TIMEOUT') or 20)
+    # Price table extraction backend: 'auto' (the pure-Python 'html' parser), 'lxml', 'html' or 'bs4'
+    SCRAPER_PARSER = os.environ.get('SCRAPER_PARSER') or 'auto'
+    # Keep each vendor's previous price next to its latest one so /prices can show the change
+    LATEST_PRICE_DELTAS = (os.environ.get('LATEST_PRICE_DELTAS') or 'true').lower() in ('1', 'true', 'yes')
+
+    # EIA v2 API; point EIA_API_URL at a local stub (python -m benchmarks.stubs) for development
+    EIA_API_URL = os.environ.get('EIA_API_URL') or 'https://api.eia.gov/v2'
+    EIA_API_KEY = os.environ.get('EIA_API_KEY') or 'r5rztCthY9srZ1aBSnuzNZwcREkSujGwmXcAQ5KW'
+    EIA_PAGE_SIZE = int(os.environ.get('EIA_PAGE_SIZE') or 5000)
+    # Comma separated EIA series codes to track; the first one is charted on /trends
+    EIA_SERIES = [code.strip() for code in (os.environ.get('EIA_SERIES') or 'W_EPD2F_PRS_SRI_DPG').split(',') if code.strip()]
+
+    # SQLite file holding cached view data, shared by all workers (defaults to the instance folder)
+    CACHE_PATH = os.environ.get('CACHE_PATH')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 500)
+    # Identifies the deployed build in cache keys and ETags; unset, a digest of the code and templates is used
+    CACHE_SALT = os.environ.get('CACHE_SALT') or os.environ.get('BUILD_ID')
+
+    # SQLite file the workers add their request and job metrics to (defaults to the instance folder)
+    METRICS_PATH = os.environ.get('METRICS_PATH')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL') or 10)
+    # When set, /metrics requires "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # SMTP relay for price alert mails; without one, alerts are only listed on the Alerts page
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT') or 25)
+    MAIL_SENDER = os.environ.get('MAIL_SENDER') or 'alerts@etrends.local'
+    ALERT_MAX_ATTEMPTS = int(os.environ.get('ALERT_MAX_ATTEMPTS') or 5)
+
+    # Content-addressed store of every fetched page and API response (defaults to the instance folder)
+    ARCHIVE_ENABLED = (os.environ.get('ARCHIVE_ENABLED') or 'true').lower() in ('1', 'true', 'yes')
+    ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR')
@@ -0,0 +1,62 @@
+"""Engine setup: SQLite pragmas applied on connect, and a read engine for read-only views.
+
+In WAL mode readers work from the last committed snapshot and are never
+blocked by the writer, so views that go through read_db keep answering
+while a scrape or import holds its write transaction open.
+"""
+from flask.globals import app_ctx
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from models import db
+
+def sqlite_pragmas(config):
+    # busy_timeout first, so switching the journal mode waits out other connections
+    pragmas = {
+        'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT'),
+        'journal_mode': config.get('SQLITE_JOURNAL_MODE'),
+        'synchronous': config.get('SQLITE_SYNCHRONOUS'),
+        'cache_size': config.get('SQLITE_CACHE_SIZE'),
+    }
+    return {name: value for name, value in pragmas.items() if value not in (None, '')}
+
+def apply_pragmas(engine, pragmas):
+    """Run PRAGMA name=value for each pragma on every new connection of a SQLite engine."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def in_memory(engine):
+    return engine.dialect.name == 'sqlite' and engine.url.database in (None, '', ':memory:')
+
+class ReadDatabase:
+    """A session on the 'read' bind for views that only query."""
+
+    def __init__(self, app=None):
+        self.engine = None
+        self.session = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        pragmas = sqlite_pragmas(app.config)
+        with app.app_context():
+            apply_pragmas(db.engine, pragmas)
+            # An in-memory database can't be opened twice, so it is read through the main engine
+            self.engine = db.engines.get('read')
+            if self.engine is None or in_memory(db.engine):
+                self.engine = db.engine
+            else:
+                apply_pragmas(self.engine, dict(pragmas, query_only=1))
+        self.session = scoped_session(sessionmaker(bind=self.engine), scopefunc=lambda: id(app_ctx._get_current_object()))
+        app.teardown_appcontext(self.remove)
+
+    def remove(self, exc=None):
+        self.session.remove()
+
+read_db = ReadDatabase()
@@ -0,0 +1,90 @@
+"""Streaming exports of price history as CSV or NDJSON.
+
+Rows are read through a server-side cursor in yield_per batches and
+encoded a batch at a time, so memory stays flat however many rows there
+are and the first chunk goes out as soon as the first batch is read.
+"""
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select, type_coerce
+from models import db, Vendor, PriceData, FederalSeries, FederalPriceData
+from database import read_db
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+COLUMNS = {
+    'prices': ['date', 'vendor_id', 'vendor', 'town', 'zone', 'price'],
+    'federal': ['date', 'series', 'price'],
+}
+
+def export_query(dataset, start=None, end=None):
+    # Ordered to follow idx_price_vendor_date_price / uq_federal_series_date, so nothing is sorted up
+    # front. Dates are read as stored rather than parsed into date objects only to be written back out.
+    if dataset == 'prices':
+        query = (
+            select(type_coerce(PriceData.date, db.String), Vendor.id, Vendor.name, Vendor.town, Vendor.zone, PriceData.price)
+            .join(Vendor, Vendor.id == PriceData.vendor_id)
+            .order_by(PriceData.vendor_id, PriceData.date)
+        )
+        date_column = PriceData.date
+    elif dataset == 'federal':
+        query = (
+            select(type_coerce(FederalPriceData.date, db.String), FederalSeries.code, FederalPriceData.price)
+            .join(FederalSeries, FederalSeries.id == FederalPriceData.series_id)
+            .order_by(FederalPriceData.series_id, FederalPriceData.date)
+        )
+        date_column = FederalPriceData.date
+    else:
+        raise ValueError(f"Unknown dataset {dataset}")
+    if start is not None:
+        query = query.where(date_column >= start)
+    if end is not None:
+        query = query.where(date_column <= end)
+    return query
+
+def export_rows(dataset, start=None, end=None, batch_size=5000):
+    """Yield the dataset's rows as tuples in COLUMNS order."""
+    # Core rows straight off the cursor; the ORM would only add per-row overhead here
+    result = read_db.session.connection().execute(export_query(dataset, start, end).execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield from partition
+
+def encode(rows, columns, fmt, batch_size=5000):
+    """Yield the rows as text in fmt, one chunk per batch_size rows."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    count = 0
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+            buffer.write('\n')
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks):
+    """Gzip a stream of text chunks, flushing after each so the client gets data as it is read."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def export(dataset, fmt='csv', start=None, end=None, compress=False, batch_size=5000):
+    """The whole export as a generator of bytes."""
+    chunks = encode(export_rows(dataset, start, end, batch_size), COLUMNS[dataset], fmt, batch_size)
+    if compress:
+        return gzip_chunks(chunks)
+    return (chunk.encode() for chunk in chunks)
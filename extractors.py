@@ -0,0 +1,166 @@
+"""Backends that pull the cell text of the first <table> out of a page.
+
+Every backend returns the table as a list of rows, each a list of stripped
+cell strings, with the same row/cell semantics as
+``soup.find('table').find_all('tr')`` / ``row.find_all('td')`` under
+BeautifulSoup's html.parser. They return None when the page has no table.
+
+The pure-Python backend reproduces that tree exactly, including its habit of
+nesting unclosed <td> elements, and is the default. lxml repairs unclosed
+<td> and <tr> markup instead, so on such tables it gives different rows;
+tests/test_extractors.py checks every backend against bs4 on the saved pages
+in tests/fixtures/pages, and ``flask check-extractors`` on any others.
+"""
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup, UnicodeDammit
+
+try:
+    from lxml import etree
+    # Comments and script/style contents are not part of a cell's text
+    CELL_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+except ImportError:  # lxml is optional, the pure-Python backend is used instead
+    etree = None
+
+CHUNK_SIZE = 64 * 1024
+
+# Elements BeautifulSoup closes as soon as they open
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer',
+}
+
+# Their text is not part of a cell's .text
+RAW_TEXT_ELEMENTS = {'script', 'style', 'template'}
+
+def decode(content):
+    """Decode page bytes the same way BeautifulSoup does."""
+    if isinstance(content, str):
+        return content
+    return UnicodeDammit(content, is_html=True).unicode_markup
+
+def table_rows_bs4(content):
+    """Reference backend: builds the full BeautifulSoup tree."""
+    table = BeautifulSoup(content, 'html.parser').find('table')
+    if table is None:
+        return None
+    return [[td.text.strip() for td in tr.find_all('td')] for tr in table.find_all('tr')]
+
+class FirstTableParser(HTMLParser):
+    """Streaming parser that only keeps the first table and stops once it closes.
+
+    Open elements are tracked the way BeautifulSoup's html.parser builder does
+    it (no implicit closing, an end tag pops back to its matching start tag),
+    so unclosed cells nest and their text is shared exactly as in the tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []  # (tag, record) for each open element inside the table
+        self.rows = []
+        self.found = False
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if not self.found:
+            if tag == 'table':
+                self.found = True
+                self.stack.append((tag, None))
+            return
+        if tag in VOID_ELEMENTS:
+            return
+
+        record = None
+        if tag == 'tr':
+            record = []
+            self.rows.append(record)
+        elif tag == 'td':
+            record = []
+            for open_tag, open_record in self.stack:
+                if open_tag == 'tr':
+                    open_record.append(record)
+        self.stack.append((tag, record))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if not self.found or self.done:
+            return
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                del self.stack[i:]
+                break
+        if not self.stack:
+            self.done = True
+
+    def handle_data(self, data):
+        if self.done or not self.found:
+            return
+        cells = []
+        for tag, record in self.stack:
+            if tag in RAW_TEXT_ELEMENTS:
+                return
+            if tag == 'td':
+                cells.append(record)
+        for cell in cells:
+            cell.append(data)
+
+def table_rows_html(content):
+    """Pure-Python backend: html.parser fed in chunks, stopping after the first table."""
+    text = decode(content)
+    parser = FirstTableParser()
+    for start in range(0, len(text), CHUNK_SIZE):
+        parser.feed(text[start:start + CHUNK_SIZE])
+        if parser.done:
+            break
+    else:
+        parser.close()
+    if not parser.found:
+        return None
+    return [[''.join(cell).strip() for cell in row] for row in parser.rows]
+
+def table_rows_lxml(content):
+    """lxml backend: pull-parses only until the first table element has closed."""
+    parser = etree.HTMLPullParser(events=('start', 'end'), tag='table')
+    text = decode(content)
+    table = None
+    closed = False
+    for start in range(0, len(text), CHUNK_SIZE):
+        parser.feed(text[start:start + CHUNK_SIZE])
+        for event, element in parser.read_events():
+            if table is None and event == 'start':
+                table = element
+            elif event == 'end' and element is table:
+                closed = True
+        if closed:
+            break
+    else:
+        parser.close()
+    if table is None:
+        return None
+    return [[''.join(CELL_TEXT(td)).strip() for td in tr.iter('td')] for tr in table.iter('tr')]
+
+BACKENDS = {
+    'bs4': table_rows_bs4,
+    'html': table_rows_html,
+    'lxml': table_rows_lxml,
+}
+
+def get_extractor(name='auto'):
+    """Return the table extraction function for a backend name.
+
+    'auto' is the pure-Python parser, which matches bs4 on every saved page;
+    lxml has to be asked for by name until it does too.
+    """
+    if name == 'auto':
+        name = 'html'
+    if name == 'lxml' and etree is None:
+        raise ValueError("The lxml extraction backend needs the lxml package installed")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extraction backend: {name}")
+    return BACKENDS[name]
@@ -0,0 +1,137 @@
+import requests
+from datetime import datetime
+import logging
+from sqlalchemy import select, func
+from models import db, FederalSeries, FederalPriceData, upsert, bump_data_version
+from analytics import refresh_analytics
+from archive import archive_response
+
+class FederalFetcher:
+    """Pulls weekly price series from the EIA v2 API into FederalPriceData."""
+
+    def __init__(self, api_key, base_url="https://api.eia.gov/v2", series=None, page_size=5000, timeout=30, archive=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        # EIA series codes that must exist in FederalSeries before fetching
+        self.series = list(series or [])
+        self.page_size = page_size
+        self.timeout = timeout
+        # PageArchive that keeps every API response, if any
+        self.archive = archive
+        self.session = requests.Session()
+        self.logger = logging.getLogger(__name__)
+
+    def ensure_series(self):
+        """Register any configured series code missing from FederalSeries."""
+        known = set(db.session.execute(select(FederalSeries.code)).scalars())
+        for code in self.series:
+            if code not in known:
+                db.session.add(FederalSeries(code=code))
+                self.logger.info(f"Registered federal series {code}")
+        db.session.commit()
+
+    def fetch_pages(self, series, start=None, artifacts=None):
+        """Yield every data item for a series, following EIA offset pagination.
+
+        With an archive, each response is archived and its ScrapeArtifact row appended to artifacts.
+        """
+        url = f"{self.base_url}/{series.route}/data/"
+        offset = 0
+        while True:
+            params = [
+                ('frequency', series.frequency),
+                ('data[0]', 'value'),
+                ('facets[series][]', series.code),
+                ('sort[0][column]', 'period'),
+                ('sort[0][direction]', 'asc'),
+                ('offset', offset),
+                ('length', self.page_size),
+                ('api_key', self.api_key),
+            ]
+            if start is not None:
+                params.append(('start', start.isoformat()))
+
+            self.logger.info(f"Fetching {series.code} from {url} (offset {offset}, start {start})")
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            if self.archive is not None and artifacts is not None:
+                archive_response(self.archive, 'Federal', series.code, response, artifacts)
+            body = response.json()['response']
+            items = body['data']
+            yield from items
+
+            offset += len(items)
+            if not items or offset >= int(body.get('total') or 0):
+                break
+
+    def fetch_points(self, series, latest=None, full=False, artifacts=None):
+        """Fetch one series as a {date: price} dict.
+
+        Incremental fetches start at the newest stored week, so a revised
+        value for that week is still picked up.
+        """
+        start = None if full or latest is None else latest
+        points = {}
+        for item in self.fetch_pages(series, start, artifacts):
+            if item.get('value') is None:
+                continue
+            date = datetime.strptime(item['period'], "%Y-%m-%d").date()
+            points[date] = float(item['value'])
+        return points
+
+    def write_points(self, series, points):
+        """Upsert the points of one series that are new or changed, stamped with a new data version. Returns (new, updated)."""
+        if not points:
+            return 0, 0
+
+        existing = dict(db.session.execute(
+            select(FederalPriceData.date, FederalPriceData.price)
+            .where(FederalPriceData.series_id == series.id, FederalPriceData.date >= min(points))
+        ).all())
+        rows = [
+            {'series_id': series.id, 'date': date, 'price': price}
+            for date, price in points.items()
+            if existing.get(date) != price
+        ]
+        if not rows:
+            return 0, 0
+        version = bump_data_version()
+        for row in rows:
+            row['version'] = version
+        upsert(FederalPriceData, rows, ['series_id', 'date'], ['price', 'version'])
+        new_entries = sum(1 for row in rows if row['date'] not in existing)
+        return new_entries, len(rows) - new_entries
+
+    def fetch(self, full=False, progress=None, artifacts=None):
+        """Fetch every registered series, then write them in one transaction. Returns (new, updated) totals.
+
+        progress, if given, is called with 'fetch' and then 'write'. Archived
+        responses' ScrapeArtifact rows are appended to artifacts, if given.
+        """
+        progress = progress or (lambda stage: None)
+        self.ensure_series()
+        latest_dates = dict(db.session.execute(
+            select(FederalPriceData.series_id, func.max(FederalPriceData.date))
+            .group_by(FederalPriceData.series_id)
+        ).all())
+
+        progress('fetch')
+        fetched = [
+            (series, self.fetch_points(series, latest_dates.get(series.id), full=full, artifacts=artifacts))
+            for series in FederalSeries.query.order_by(FederalSeries.id).all()
+        ]
+
+        progress('write')
+        new_entries = 0
+        updated_entries = 0
+        for series, points in fetched:
+            new, updated = self.write_points(series, points)
+            self.logger.info(f"Federal series {series.code}: {new} new, {updated} updated")
+            new_entries += new
+            updated_entries += updated
+
+        if new_entries or updated_entries:
+            # Spreads are measured against the first series
+            refresh_analytics(self.series[0] if self.series else None)
+        db.session.commit()
+        return new_entries, updated_entries
@@ -0,0 +1,5 @@
+"""Gunicorn settings; only served workers join the scheduler election."""
+
+def post_worker_init(worker):
+    from app import start_scheduler_leader
+    start_scheduler_leader()
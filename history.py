@@ -0,0 +1,122 @@
+"""Scrape history: keyset pages over ScrapeLog and compaction of old entries.
+
+Pages are addressed by a cursor on (timestamp, id) rather than an offset,
+so fetching any page is one index range scan however long the log is.
+Entries older than the retention period are folded into ScrapeLogDaily.
+"""
+from datetime import date, datetime, time, timedelta
+import logging
+from sqlalchemy import select, func, case, tuple_
+from models import db, ScrapeLog, ScrapeLogDaily, ScrapeArtifact, upsert
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+
+def encode_cursor(log):
+    return f"{log.timestamp.isoformat()}_{log.id}"
+
+def decode_cursor(cursor):
+    """Parse a cursor back into (timestamp, id); raises ValueError if it is malformed."""
+    timestamp, _, log_id = cursor.rpartition('_')
+    return datetime.fromisoformat(timestamp), int(log_id)
+
+def scrape_log_page(scrape_type=None, success=None, scheduled=None, before=None, after=None, limit=PAGE_SIZE):
+    """One page of ScrapeLog entries, newest first.
+
+    before and after are cursors taken from the ends of another page.
+    Returns (logs, older, newer) where older and newer are the cursors for
+    the neighbouring pages, or None when there is no such page.
+    """
+    query = select(ScrapeLog)
+    if scrape_type:
+        query = query.where(ScrapeLog.scrape_type == scrape_type)
+    if success is not None:
+        query = query.where(ScrapeLog.success == success)
+    if scheduled is not None:
+        query = query.where(ScrapeLog.scheduled == scheduled)
+
+    key = tuple_(ScrapeLog.timestamp, ScrapeLog.id)
+    if after:
+        rows = db.session.execute(
+            query.where(key > tuple_(*decode_cursor(after)))
+            .order_by(ScrapeLog.timestamp, ScrapeLog.id)
+            .limit(limit + 1)
+        ).scalars().all()
+        logs = list(reversed(rows[:limit]))
+        newer = encode_cursor(logs[0]) if len(rows) > limit else None
+        older = encode_cursor(logs[-1]) if logs else None
+    else:
+        if before:
+            query = query.where(key < tuple_(*decode_cursor(before)))
+        rows = db.session.execute(
+            query.order_by(ScrapeLog.timestamp.desc(), ScrapeLog.id.desc()).limit(limit + 1)
+        ).scalars().all()
+        logs = rows[:limit]
+        older = encode_cursor(logs[-1]) if len(rows) > limit else None
+        newer = encode_cursor(logs[0]) if before and logs else None
+    return logs, older, newer
+
+def daily_summaries(scrape_type=None, scheduled=None, limit=60):
+    """The most recent ScrapeLogDaily rows, newest day first."""
+    query = select(ScrapeLogDaily)
+    if scrape_type:
+        query = query.where(ScrapeLogDaily.scrape_type == scrape_type)
+    if scheduled is not None:
+        query = query.where(ScrapeLogDaily.scheduled == scheduled)
+    return db.session.execute(
+        query.order_by(ScrapeLogDaily.day.desc(), ScrapeLogDaily.scrape_type, ScrapeLogDaily.scheduled).limit(limit)
+    ).scalars().all()
+
+def compact_scrape_logs(retention_days, today=None):
+    """Fold ScrapeLog entries from before the retention period into ScrapeLogDaily.
+
+    Only whole days are compacted, and counts are added to any summary row
+    the day already has. Returns the number of entries removed.
+    """
+    today = today or date.today()
+    cutoff = datetime.combine(today - timedelta(days=retention_days), time.min)
+    day = func.date(ScrapeLog.timestamp, type_=db.Date)
+    rows = db.session.execute(
+        select(
+            day.label('day'),
+            ScrapeLog.scrape_type,
+            ScrapeLog.scheduled,
+            func.count().label('runs'),
+            func.sum(case((ScrapeLog.success.is_(False), 1), else_=0)).label('failures'),
+            func.count(ScrapeLog.duration).label('timed_runs'),
+            func.coalesce(func.sum(ScrapeLog.duration), 0).label('total_duration'),
+        )
+        .where(ScrapeLog.timestamp < cutoff)
+        .group_by(day, ScrapeLog.scrape_type, ScrapeLog.scheduled)
+    ).all()
+    if not rows:
+        return 0
+
+    existing = {
+        (summary.day, summary.scrape_type, summary.scheduled): summary
+        for summary in ScrapeLogDaily.query.filter(ScrapeLogDaily.day.in_({row.day for row in rows}))
+    }
+    summaries = []
+    for row in rows:
+        summary = existing.get((row.day, row.scrape_type, row.scheduled))
+        summaries.append({
+            'day': row.day,
+            'scrape_type': row.scrape_type,
+            'scheduled': row.scheduled,
+            'runs': row.runs + (summary.runs if summary else 0),
+            'failures': row.failures + (summary.failures if summary else 0),
+            'timed_runs': row.timed_runs + (summary.timed_runs if summary else 0),
+            'total_duration': row.total_duration + (summary.total_duration if summary else 0),
+        })
+    upsert(ScrapeLogDaily, summaries, ['day', 'scrape_type', 'scheduled'], ['runs', 'failures', 'timed_runs', 'total_duration'])
+    # Archived pages outlive their log entries; SQLite does not apply ON DELETE SET NULL itself
+    db.session.execute(
+        ScrapeArtifact.__table__.update()
+        .where(ScrapeArtifact.scrape_log_id.in_(select(ScrapeLog.id).where(ScrapeLog.timestamp < cutoff)))
+        .values(scrape_log_id=None)
+    )
+    removed = db.session.execute(ScrapeLog.__table__.delete().where(ScrapeLog.timestamp < cutoff)).rowcount
+    db.session.commit()
+    logger.info(f"Compacted {removed} scrape log entries before {cutoff.date()} into {len(summaries)} daily summaries")
+    return removed
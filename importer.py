@@ -0,0 +1,174 @@
+"""Backfill PriceData from CSV files and saved newenglandoil.com pages.
+
+Records go through the same parsing and vendor resolution as Scraper and
+are upserted in chunks, one transaction per chunk. The chunk commits
+together with the file's ImportProgress row, so an interrupted import
+resumes after the last committed chunk. Rollups, LatestPrice and analytics
+are rebuilt once at the end instead of after every chunk.
+"""
+import csv
+from datetime import date, datetime
+from itertools import islice
+import logging
+import os
+import time
+from models import db, ImportProgress, upsert
+from rollups import rebuild_rollups
+from latest import rebuild_latest_prices
+from analytics import refresh_analytics
+from archive import reparse
+
+logger = logging.getLogger(__name__)
+
+CSV_SUFFIXES = ('.csv',)
+HTML_SUFFIXES = ('.html', '.htm')
+
+def collect_files(paths):
+    """Expand directories into the CSV and HTML files under them, in a stable order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name) for name in names
+                    if name.lower().endswith(CSV_SUFFIXES + HTML_SUFFIXES)
+                )
+        else:
+            files.append(path)
+    return sorted(os.path.abspath(path) for path in files)
+
+class Importer:
+    def __init__(self, scraper, zone, chunk_size=50000):
+        self.scraper = scraper
+        # Zone for HTML pages and for CSV rows without a zone column
+        self.zone = zone
+        self.chunk_size = chunk_size
+
+    def parse_date(self, value):
+        value = (value or '').strip()
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return self.scraper.parse_date(value)
+
+    def csv_records(self, path):
+        """Yield (zone, company, town, price, date) records from a CSV with a header row.
+
+        The columns are those of `flask export prices` (date, vendor, town,
+        zone, price); 'company' is accepted for vendor and zone is optional.
+        """
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for i, row in enumerate(csv.DictReader(f), start=1):
+                name = (row.get('vendor') or row.get('company') or '').strip()
+                price = self.scraper.parse_price((row.get('price') or '').strip())
+                day = self.parse_date(row.get('date'))
+                if not name or price is None or day is None:
+                    logger.warning(f"{path}: skipping row {i}, missing vendor, price or date")
+                    continue
+                yield ((row.get('zone') or '').strip() or self.zone, name, (row.get('town') or '').strip(), price, day)
+
+    def html_records(self, path):
+        with open(path, 'rb') as f:
+            content = f.read()
+        return iter(self.scraper.extract(content, self.zone))
+
+    def records(self, path):
+        if path.lower().endswith(HTML_SUFFIXES):
+            return self.html_records(path)
+        return self.csv_records(path)
+
+    def import_file(self, path):
+        """Import one file, resuming where a previous run stopped. Returns the records written."""
+        stat = os.stat(path)
+        progress = db.session.get(ImportProgress, path)
+        if progress is not None and (progress.size, progress.mtime) != (stat.st_size, stat.st_mtime):
+            logger.info(f"{path} changed since it was last imported, starting over")
+            progress = None
+        if progress is not None and progress.finished:
+            logger.info(f"{path} already imported, skipping")
+            return 0
+
+        done = progress.rows_done if progress is not None else 0
+        records = islice(self.records(path), done, None)
+        written = 0
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if chunk:
+                self.scraper.write_prices(chunk)
+            done += len(chunk)
+            written += len(chunk)
+            finished = len(chunk) < self.chunk_size
+            upsert(ImportProgress, [{
+                'path': path,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'rows_done': done,
+                'finished': finished,
+                'updated_at': datetime.now(),
+            }], ['path'], ['size', 'mtime', 'rows_done', 'finished', 'updated_at'])
+            db.session.commit()
+            if finished:
+                return written
+            logger.info(f"{path}: {done} records committed")
+
+    def run(self, paths, report=logger.info):
+        """Import every file, then rebuild the derived tables. Returns (records, seconds)."""
+        started = time.perf_counter()
+        total = 0
+        for path in collect_files(paths):
+            file_started = time.perf_counter()
+            try:
+                written = self.import_file(path)
+            except Exception:
+                db.session.rollback()
+                raise
+            elapsed = time.perf_counter() - file_started
+            total += written
+            if written:
+                report(f"{path}: {written} records in {elapsed:.1f}s ({written / elapsed:.0f} rows/s)")
+
+        # Derived tables are rebuilt even when nothing new was read, in case the
+        # previous run was interrupted after its last chunk but before this step
+        self.rebuild(report)
+
+        elapsed = time.perf_counter() - started
+        report(f"Imported {total} records in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+        return total, elapsed
+
+    def rebuild(self, report=logger.info):
+        started = time.perf_counter()
+        rebuild_latest_prices(with_deltas=self.scraper.price_deltas)
+        rebuild_rollups()
+        refresh_analytics(self.scraper.benchmark_series)
+        db.session.commit()
+        report(f"Rebuilt latest prices, rollups and analytics in {time.perf_counter() - started:.1f}s")
+
+    def reparse_archive(self, archive, pages, parser='auto', workers=None, report=logger.info):
+        """Re-import archived price pages, an iterable of (digest, zone), parsed across worker processes.
+
+        Pages are written in the order given, so list them by when they were
+        last fetched to let the newest copy of a price win. Returns (records, failed pages, seconds).
+        """
+        started = time.perf_counter()
+        total = 0
+        failed = 0
+        chunk = []
+        for records, error in reparse(archive, pages, parser, workers):
+            if error is not None:
+                failed += 1
+                report(f"Could not parse {error}")
+            chunk.extend(records)
+            if len(chunk) >= self.chunk_size:
+                self.scraper.write_prices(chunk)
+                db.session.commit()
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            self.scraper.write_prices(chunk)
+            db.session.commit()
+            total += len(chunk)
+
+        self.rebuild(report)
+        elapsed = time.perf_counter() - started
+        report(f"Re-parsed {total} records in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s), {failed} page(s) failed")
+        return total, failed, elapsed
@@ -0,0 +1,158 @@
+"""Persistent queue for scrapes and federal fetches, run off the request path.
+
+A trigger inserts a Job row and returns straight away; a worker thread in
+the scheduler leader claims queued jobs oldest first and runs them. A
+partial unique index keeps at most one queued or running job per type, so
+a trigger arriving while one is pending is merged into it.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from models import db, Job
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ('queued', 'running')
+
+class Progress:
+    """Stage callback handed to a job runner, timing each stage as it goes."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.stage = None
+        self.timings = {}
+        self._started = None
+
+    def __call__(self, stage):
+        self.finish()
+        self.stage = stage
+        self._started = time.perf_counter()
+        # Own connection, so the runner's session and its transaction are left alone
+        with db.engine.begin() as conn:
+            conn.execute(
+                Job.__table__.update()
+                .where(Job.__table__.c.id == self.job_id)
+                .values(stage=stage, timings=json.dumps(self.timings))
+            )
+
+    def finish(self):
+        if self.stage is not None:
+            elapsed = time.perf_counter() - self._started
+            self.timings[self.stage] = round(self.timings.get(self.stage, 0) + elapsed, 3)
+            self.stage = None
+
+class JobQueue:
+    def __init__(self, app=None, poll_interval=2):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.runners = {}
+        self._wake = threading.Event()
+
+    def register(self, job_type):
+        """Decorator registering runner(scheduled, progress) -> (success, message) for job_type."""
+        def decorator(runner):
+            self.runners[job_type] = runner
+            return runner
+        return decorator
+
+    def active(self, job_type):
+        return Job.query.filter(Job.job_type == job_type, Job.status.in_(ACTIVE)).first()
+
+    def enqueue(self, job_type, scheduled=False):
+        """Queue a job_type job, or merge into the one already pending. Returns (job, merged)."""
+        if job_type not in self.runners:
+            raise ValueError(f"Unknown job type {job_type}")
+        # The unique index rejects a second pending job, in which case the winner is picked up
+        for _ in range(3):
+            job = self.active(job_type)
+            if job is not None:
+                logger.info(f"{job_type} job merged into pending job {job.id}")
+                return job, True
+            job = Job(job_type=job_type, status='queued', scheduled=scheduled, created_at=datetime.now())
+            db.session.add(job)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                continue
+            logger.info(f"{job_type} job {job.id} queued")
+            self._wake.set()
+            return job, False
+        raise RuntimeError(f"Could not queue {job_type} job")
+
+    def claim(self):
+        """Move the oldest queued job to running and return it, or None if there is none."""
+        job = Job.query.filter_by(status='queued').order_by(Job.id).first()
+        if job is None:
+            return None
+        claimed = db.session.execute(
+            Job.__table__.update()
+            .where(Job.__table__.c.id == job.id, Job.__table__.c.status == 'queued')
+            .values(status='running', started_at=datetime.now())
+        ).rowcount
+        db.session.commit()
+        return job if claimed else None
+
+    def run(self, job):
+        logger.info(f"Running {job.job_type} job {job.id}")
+        progress = Progress(job.id)
+        try:
+            success, message = self.runners[job.job_type](job.scheduled, progress)
+        except Exception as e:
+            db.session.rollback()
+            success = False
+            message = f"Error running job: {str(e)}"
+            logger.error(message, exc_info=True)
+        progress.finish()
+
+        job = db.session.get(Job, job.id)
+        job.status = 'succeeded' if success else 'failed'
+        job.stage = None
+        job.message = message
+        job.timings = json.dumps(progress.timings)
+        job.finished_at = datetime.now()
+        db.session.commit()
+        duration = (job.finished_at - job.started_at).total_seconds()
+        logger.info(f"{job.job_type} job {job.id} {job.status} in {duration:.1f}s")
+        metrics.record_job(job.job_type, job.status, progress.timings, duration)
+
+    def run_pending(self):
+        """Run queued jobs until none are left."""
+        while True:
+            job = self.claim()
+            if job is None:
+                return
+            self.run(job)
+
+    def recover(self):
+        """Fail jobs left running by a previous leader that died part way through."""
+        stale = Job.query.filter_by(status='running').all()
+        for job in stale:
+            job.status = 'failed'
+            job.message = 'Interrupted: the worker running this job exited'
+            job.finished_at = datetime.now()
+            logger.warning(f"{job.job_type} job {job.id} was interrupted")
+        db.session.commit()
+
+    def _work(self):
+        recovered = False
+        while True:
+            try:
+                with self.app.app_context():
+                    if not recovered:
+                        self.recover()
+                        recovered = True
+                    self.run_pending()
+            except Exception as e:
+                logger.error(f"Job worker failed: {str(e)}", exc_info=True)
+            # Jobs queued by this process wake the worker at once; others are seen on the next poll
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        """Start the worker thread; call only in the scheduler leader."""
+        threading.Thread(target=self._work, name='job-worker', daemon=True).start()
@@ -0,0 +1,78 @@
+"""The LatestPrice table: each vendor's newest price, kept current by ingest."""
+import logging
+from sqlalchemy import select
+from models import db, PriceData, LatestPrice, upsert
+
+logger = logging.getLogger(__name__)
+
+def newest_prices(vendor_id, limit):
+    """A vendor's newest limit prices as {date: price}, read through the (vendor_id, date) index."""
+    return dict(db.session.execute(
+        select(PriceData.date, PriceData.price)
+        .where(PriceData.vendor_id == vendor_id)
+        .order_by(PriceData.date.desc())
+        .limit(limit)
+    ).all())
+
+def latest_row(vendor_id, points, with_deltas):
+    """The LatestPrice row for a vendor from {date: price} holding at least its newest prices."""
+    dates = sorted(points, reverse=True)
+    previous = dates[1] if with_deltas and len(dates) > 1 else None
+    return {
+        'vendor_id': vendor_id,
+        'price': points[dates[0]],
+        'date': dates[0],
+        'previous_price': points[previous] if previous else None,
+        'previous_date': previous,
+    }
+
+def refresh_latest_prices(prices, with_deltas=True):
+    """Fold just-upserted prices, an iterable of {'vendor_id', 'date', 'price'} rows, into LatestPrice.
+
+    A vendor's newest two prices are among its current LatestPrice row and
+    the new rows, so no history is read; only vendors without a row, or
+    without the previous price a delta needs, look up their newest prices.
+    With with_deltas the previous price and date are stored too, so the
+    price change can be shown without another query. Does not commit;
+    callers run this inside their ingest transaction.
+    """
+    incoming = {}
+    for row in prices:
+        incoming.setdefault(row['vendor_id'], {})[row['date']] = row['price']
+    if not incoming:
+        return
+
+    existing = {
+        row.vendor_id: row
+        for row in db.session.execute(
+            select(LatestPrice.vendor_id, LatestPrice.price, LatestPrice.date, LatestPrice.previous_price, LatestPrice.previous_date)
+            .where(LatestPrice.vendor_id.in_(list(incoming)))
+        )
+    }
+    latest = []
+    for vendor_id, points in incoming.items():
+        current = existing.get(vendor_id)
+        if current is None or (with_deltas and current.previous_date is None):
+            # Runs after the upsert, so the lookup already sees the new rows
+            points = newest_prices(vendor_id, 2 if with_deltas else 1)
+        else:
+            known = {current.date: current.price}
+            if with_deltas:
+                known[current.previous_date] = current.previous_price
+            points = {**known, **points}
+        latest.append(latest_row(vendor_id, points, with_deltas))
+
+    upsert(LatestPrice, latest, ['vendor_id'], ['price', 'date', 'previous_price', 'previous_date'])
+    logger.info(f"Refreshed latest prices for {len(latest)} vendors")
+
+def rebuild_latest_prices(with_deltas=True, batch_size=500):
+    """Recompute LatestPrice for every vendor from PriceData, a batch of vendors per transaction."""
+    vendor_ids = db.session.execute(select(PriceData.vendor_id).distinct()).scalars().all()
+    for i in range(0, len(vendor_ids), batch_size):
+        latest = [
+            latest_row(vendor_id, newest_prices(vendor_id, 2 if with_deltas else 1), with_deltas)
+            for vendor_id in vendor_ids[i:i + batch_size]
+        ]
+        upsert(LatestPrice, latest, ['vendor_id'], ['price', 'date', 'previous_price', 'previous_date'])
+        db.session.commit()
+    return len(vendor_ids)
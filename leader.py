@@ -0,0 +1,83 @@
+"""Elect a single process on the host to run scheduled jobs.
+
+Every gunicorn worker joins the election once it is up (see
+gunicorn.conf.py), but only the one holding an exclusive flock on the
+lock file starts the scheduler. CLI commands never join. The OS drops the
+lock when that process exits or crashes, and the other workers, which keep
+retrying in a background thread, take over within retry_interval seconds.
+"""
+import fcntl
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LeaderElection:
+    def __init__(self, path, on_elected, retry_interval=15):
+        self.path = path
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self._file = None
+        self._stopped = threading.Event()
+
+    def try_acquire(self):
+        """Take the lock if it is free. Returns True once this process is the leader."""
+        if self.is_leader:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, 'a+')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+
+        # Keep the file open for the life of the process; closing it releases the lock
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        self._file = f
+        self.is_leader = True
+        logger.info(f"Process {os.getpid()} is now the scheduler leader")
+        self.on_elected()
+        return True
+
+    def held(self):
+        """Whether some process on the host, this one included, is the leader right now."""
+        if self.is_leader:
+            return True
+        try:
+            f = open(self.path, 'a+')
+        except OSError:
+            return False
+        try:
+            # Free means nobody leads; give it straight back so the election is unaffected
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            return False
+        except OSError:
+            return True
+        finally:
+            f.close()
+
+    def _retry(self):
+        while not self._stopped.wait(self.retry_interval):
+            try:
+                if self.try_acquire():
+                    return
+            except Exception as e:
+                logger.error(f"Scheduler leader election failed: {str(e)}", exc_info=True)
+
+    def start(self):
+        """Try to lead now, otherwise keep trying in a daemon thread for failover."""
+        if not self.try_acquire():
+            logger.info(f"Process {os.getpid()} is a scheduler follower")
+            threading.Thread(target=self._retry, name='leader-election', daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
@@ -0,0 +1,26 @@
+"""Small SQLite files shared by every gunicorn worker on the host.
+
+Used for cross-process state that is derived or disposable (response
+cache, metrics) and so should not add write load to the main database.
+"""
+import os
+import sqlite3
+import threading
+
+_local = threading.local()
+
+def connect(path):
+    """Return this thread's autocommit connection to the store at path."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        connections[path] = conn
+    return conn
@@ -0,0 +1,186 @@
+"""Request and job metrics in the Prometheus text format, summed across worker processes.
+
+Each process adds up counters and histogram buckets in memory and flushes
+the increments into a localstore file at most every flush_interval seconds.
+/metrics renders the totals from that file, so whichever worker answers
+the scrape reports the sum over all of them.
+"""
+import atexit
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from localstore import connect
+from models import db
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metric_samples (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+'''
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+STAGE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+def format_labels(labels):
+    escaped = {name: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for name, value in labels.items()}
+    return ','.join(f'{name}="{value}"' for name, value in sorted(escaped.items()))
+
+def sample_order(labels):
+    # Histogram buckets come out in bound order rather than as sorted text
+    match = re.search(r'(?:^|,)le="([^"]*)"', labels)
+    bound = math.inf if match is None or match.group(1) == '+Inf' else float(match.group(1))
+    return re.sub(r'(?:^|,)le="[^"]*"', '', labels), bound
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metrics:
+    def __init__(self, app=None):
+        self.path = None
+        self.flush_interval = 10
+        self.families = {}
+        self._pending = defaultdict(float)
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        path = app.config.get('METRICS_PATH') or os.path.join(app.instance_path, 'metrics.db')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 10)
+        try:
+            connect(path).execute(SCHEMA)
+        except (OSError, sqlite3.Error) as e:
+            # Metrics are not worth a worker; run without them
+            logger.error(f"Metrics disabled, cannot open {path}: {str(e)}")
+            return
+        self.path = path
+
+        with app.app_context():
+            for engine in {db.engine, *db.engines.values()}:
+                event.listen(engine, 'before_cursor_execute', count_query)
+        app.before_request(start_request)
+        app.after_request(self.record_request)
+        # Workers shutting down hand in what they have not flushed yet
+        atexit.register(self.flush)
+
+    def counter(self, name, help):
+        self.families[name] = ('counter', help, None)
+
+    def histogram(self, name, help, buckets):
+        self.families[name] = ('histogram', help, buckets)
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._pending[(name, format_labels(labels))] += amount
+
+    def observe(self, name, labels, value):
+        buckets = self.families[name][2]
+        with self._lock:
+            # Buckets are stored cumulative, as exposed, so they add up across processes as they are;
+            # every bucket gets a row, even at zero, so none is missing from the output
+            for bound in buckets:
+                self._pending[(f"{name}_bucket", format_labels(dict(labels, le=bound)))] += value <= bound
+            self._pending[(f"{name}_bucket", format_labels(dict(labels, le='+Inf')))] += 1
+            self._pending[(f"{name}_sum", format_labels(labels))] += value
+            self._pending[(f"{name}_count", format_labels(labels))] += 1
+
+    def flush(self):
+        """Add this process's increments since the last flush to the shared totals."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            self._flushed_at = time.monotonic()
+        if not pending or self.path is None:
+            return
+        conn = connect(self.path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                'INSERT INTO metric_samples (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value) for (name, labels), value in pending.items()],
+            )
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            logger.warning(f"Metrics flush failed: {str(e)}")
+            # Keep the increments for the next attempt
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        self.flush()
+        samples = defaultdict(list)
+        for name, labels, value in connect(self.path).execute('SELECT name, labels, value FROM metric_samples'):
+            samples[name].append((labels, value))
+
+        lines = []
+        for name, (kind, help, buckets) in self.families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            names = [name] if kind == 'counter' else [f"{name}_bucket", f"{name}_sum", f"{name}_count"]
+            for sample in names:
+                for labels, value in sorted(samples.get(sample, []), key=lambda item: sample_order(item[0])):
+                    lines.append(f"{sample}{{{labels}}} {format_value(value)}" if labels else f"{sample} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def record_request(self, response):
+        started = g.pop('request_started', None)
+        if started is None or request.endpoint in (None, 'static'):
+            return response
+        labels = {'endpoint': request.endpoint}
+        self.observe('etrends_request_duration_seconds', labels, time.perf_counter() - started)
+        self.observe('etrends_request_queries', labels, g.pop('query_count', 0))
+        self.inc('etrends_requests_total', dict(labels, status=response.status_code))
+        self.maybe_flush()
+        return response
+
+    def record_job(self, job_type, status, timings, duration):
+        if not self.enabled:
+            return
+        self.inc('etrends_jobs_total', {'job_type': job_type, 'status': status})
+        self.observe('etrends_job_duration_seconds', {'job_type': job_type}, duration)
+        for stage, seconds in timings.items():
+            self.observe('etrends_job_stage_seconds', {'job_type': job_type, 'stage': stage}, seconds)
+        # Jobs are rare and run in the background, so they are written out straight away
+        self.flush()
+
+def start_request():
+    g.request_started = time.perf_counter()
+    g.query_count = 0
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+metrics = Metrics()
+metrics.counter('etrends_requests_total', 'HTTP requests by endpoint and status.')
+metrics.histogram('etrends_request_duration_seconds', 'Time to build the response, by endpoint.', LATENCY_BUCKETS)
+metrics.histogram('etrends_request_queries', 'SQL statements executed per request, by endpoint.', QUERY_BUCKETS)
+metrics.counter('etrends_jobs_total', 'Finished scrape and federal fetch jobs by type and status.')
+metrics.histogram('etrends_job_duration_seconds', 'Wall time of finished jobs, by type.', STAGE_BUCKETS)
+metrics.histogram('etrends_job_stage_seconds', 'Time spent in each job stage (fetch, parse, write).', STAGE_BUCKETS)
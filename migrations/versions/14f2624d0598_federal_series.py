@@ -0,0 +1,65 @@
+"""federal series
+
+Revision ID: 14f2624d0598
+Revises: 934d09624e23
+Create Date: 2026-10-17 03:27:44.655140
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '14f2624d0598'
+down_revision = '934d09624e23'
+branch_labels = None
+depends_on = None
+
+
+# The original unique constraint on federal_price_data.date was unnamed
+naming_convention = {
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def upgrade():
+    op.create_table('federal_series',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('route', sa.String(length=100), nullable=False),
+    sa.Column('frequency', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+
+    # Existing rows all belong to the series that used to be hardcoded
+    op.execute(
+        "INSERT INTO federal_series (id, code, route, frequency, name) VALUES "
+        "(1, 'W_EPD2F_PRS_SRI_DPG', 'petroleum/pri/wfr', 'weekly', "
+        "'Rhode Island No. 2 Heating Oil Residential Price')"
+    )
+    with op.batch_alter_table('federal_price_data', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('series_id', sa.Integer(), nullable=True))
+    op.execute("UPDATE federal_price_data SET series_id = 1")
+
+    with op.batch_alter_table('federal_price_data', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.alter_column('series_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_constraint('uq_federal_price_data_date', type_='unique')
+        batch_op.create_unique_constraint('uq_federal_series_date', ['series_id', 'date'])
+        batch_op.create_foreign_key('fk_federal_price_data_series_id_federal_series', 'federal_series', ['series_id'], ['id'])
+
+
+def downgrade():
+    op.execute(
+        "DELETE FROM federal_price_data WHERE series_id != "
+        "(SELECT id FROM federal_series WHERE code = 'W_EPD2F_PRS_SRI_DPG')"
+    )
+    with op.batch_alter_table('federal_price_data', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('fk_federal_price_data_series_id_federal_series', type_='foreignkey')
+        batch_op.drop_constraint('uq_federal_series_date', type_='unique')
+        batch_op.drop_column('series_id')
+        batch_op.create_unique_constraint('uq_federal_price_data_date', ['date'])
+
+    op.drop_table('federal_series')
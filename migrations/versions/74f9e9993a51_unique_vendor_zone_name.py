@@ -0,0 +1,79 @@
+"""unique vendor zone name
+
+Revision ID: 74f9e9993a51
+Revises: eec6fb239fca
+Create Date: 2026-10-17 04:44:17.080718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '74f9e9993a51'
+down_revision = 'eec6fb239fca'
+branch_labels = None
+depends_on = None
+
+
+# Rows a duplicate vendor owns are moved onto the kept vendor unless it already has one for the same key
+MERGES = (
+    "UPDATE price_data SET vendor_id = :keep WHERE vendor_id = :duplicate "
+    "AND date NOT IN (SELECT date FROM price_data WHERE vendor_id = :keep)",
+    "DELETE FROM price_data WHERE vendor_id = :duplicate",
+    "UPDATE alert_rule SET vendor_id = :keep WHERE vendor_id = :duplicate",
+    "UPDATE alert_outbox SET vendor_id = :keep WHERE vendor_id = :duplicate "
+    "AND NOT EXISTS (SELECT 1 FROM alert_outbox kept WHERE kept.vendor_id = :keep "
+    "AND kept.rule_id = alert_outbox.rule_id AND kept.date = alert_outbox.date)",
+    "DELETE FROM alert_outbox WHERE vendor_id = :duplicate",
+    # Derived rows are rebuilt for the kept vendor below; analytics are redone by the next ingest
+    "DELETE FROM latest_price WHERE vendor_id IN (:keep, :duplicate)",
+    "DELETE FROM vendor_price_rollup WHERE vendor_id IN (:keep, :duplicate)",
+    "DELETE FROM vendor_analytics WHERE vendor_id IN (:keep, :duplicate)",
+    "DELETE FROM vendor WHERE id = :duplicate",
+)
+
+REBUILDS = (
+    "INSERT INTO latest_price (vendor_id, price, date, previous_price, previous_date) "
+    "SELECT vendor_id, price, date, "
+    "(SELECT p.price FROM price_data p WHERE p.vendor_id = latest.vendor_id AND p.date < latest.date ORDER BY p.date DESC LIMIT 1), "
+    "(SELECT p.date FROM price_data p WHERE p.vendor_id = latest.vendor_id AND p.date < latest.date ORDER BY p.date DESC LIMIT 1) "
+    "FROM price_data latest WHERE vendor_id = :keep "
+    "AND date = (SELECT MAX(date) FROM price_data WHERE vendor_id = :keep)",
+    "INSERT INTO vendor_price_rollup (vendor_id, granularity, bucket, min_price, max_price, mean_price, count) "
+    "SELECT vendor_id, 'day', date, MIN(price), MAX(price), AVG(price), COUNT(*) "
+    "FROM price_data WHERE vendor_id = :keep GROUP BY date",
+    "INSERT INTO vendor_price_rollup (vendor_id, granularity, bucket, min_price, max_price, mean_price, count) "
+    "SELECT vendor_id, 'week', date(date, '-' || ((CAST(strftime('%w', date) AS INTEGER) + 6) % 7) || ' days') AS week, "
+    "MIN(price), MAX(price), AVG(price), COUNT(*) "
+    "FROM price_data WHERE vendor_id = :keep GROUP BY week",
+    "INSERT INTO vendor_price_rollup (vendor_id, granularity, bucket, min_price, max_price, mean_price, count) "
+    "SELECT vendor_id, 'month', strftime('%Y-%m-01', date) AS month, MIN(price), MAX(price), AVG(price), COUNT(*) "
+    "FROM price_data WHERE vendor_id = :keep GROUP BY month",
+)
+
+
+def upgrade():
+    # Merge vendors stored more than once for a zone into the lowest id before making (zone, name) unique
+    connection = op.get_bind()
+    duplicates = connection.execute(sa.text(
+        "SELECT vendor.id, kept.id FROM vendor JOIN "
+        "(SELECT zone, name, MIN(id) AS id FROM vendor GROUP BY zone, name HAVING COUNT(*) > 1) kept "
+        "ON vendor.zone = kept.zone AND vendor.name = kept.name WHERE vendor.id != kept.id"
+    )).all()
+    for duplicate, keep in duplicates:
+        for statement in MERGES:
+            connection.execute(sa.text(statement), {'duplicate': duplicate, 'keep': keep})
+    for keep in {keep for _, keep in duplicates}:
+        for statement in REBUILDS:
+            connection.execute(sa.text(statement), {'keep': keep})
+
+    with op.batch_alter_table('vendor', schema=None) as batch_op:
+        batch_op.drop_index('idx_vendor_zone_name')
+        batch_op.create_unique_constraint('uq_vendor_zone_name', ['zone', 'name'])
+
+
+def downgrade():
+    with op.batch_alter_table('vendor', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_vendor_zone_name', type_='unique')
+        batch_op.create_index('idx_vendor_zone_name', ['zone', 'name'], unique=False)
@@ -0,0 +1,34 @@
+"""redact artifact urls
+
+Revision ID: eae146d284e3
+Revises: 74f9e9993a51
+Create Date: 2026-10-17 04:58:41.244988
+
+"""
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eae146d284e3'
+down_revision = '74f9e9993a51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Federal artifacts stored the EIA request URL with its api_key; drop it, as archive.redact_url now does
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, url FROM scrape_artifact WHERE url LIKE '%api_key=%'")).all()
+    for artifact_id, url in rows:
+        parts = urlsplit(url)
+        query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name != 'api_key']
+        connection.execute(
+            sa.text("UPDATE scrape_artifact SET url = :url WHERE id = :id"),
+            {'url': urlunsplit(parts._replace(query=urlencode(query))), 'id': artifact_id},
+        )
+
+
+def downgrade():
+    pass
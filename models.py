@@ -1,3 +1,4 @@
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 
@@ -7,30 +8,164 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
+    email = db.Column(db.String(200))  # where price alerts are mailed, if mail is configured
 
 class Vendor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     town = db.Column(db.String(100))
     phone = db.Column(db.String(20))
+    zone = db.Column(db.String(100))  # e.g. 'rhodeisland/zone4'
     prices = db.relationship('PriceData', back_populates='vendor')
 
+    __table_args__ = (
+        # A vendor is its name within a zone; ingests upsert against this
+        db.UniqueConstraint('zone', 'name', name='uq_vendor_zone_name'),
+    )
+
 class PriceData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'), nullable=False)
     price = db.Column(db.Float, nullable=False)
     date = db.Column(db.Date, nullable=False)
+    # Data version of the ingest that last wrote the row, for delta sync
+    version = db.Column(db.Integer, nullable=False, default=0)
     vendor = db.relationship('Vendor', back_populates='prices')
 
     __table_args__ = (
-        db.Index('idx_price_date', 'date'),
-        db.Index('idx_price_vendor', 'vendor_id'),
+        db.UniqueConstraint('vendor_id', 'date', name='uq_price_vendor_date'),
+        # Covers range, top-N and series reads without touching the table
+        db.Index('idx_price_vendor_date_price', 'vendor_id', 'date', 'price'),
+        # The same columns date first, for the all-vendor date ranges of analytics, ranking and exports
+        db.Index('idx_price_date_vendor_price', 'date', 'vendor_id', 'price'),
+        db.Index('idx_price_version', 'version'),
     )
 
+class LatestPrice(db.Model):
+    # One row per vendor holding its newest price, plus the one before it
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'), primary_key=True)
+    price = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    previous_price = db.Column(db.Float)
+    previous_date = db.Column(db.Date)
+    vendor = db.relationship('Vendor')
+
+    __table_args__ = (
+        db.Index('idx_latest_price_price_date', 'price', 'date'),
+    )
+
+class VendorAnalytics(db.Model):
+    # Market metrics per vendor as of the last ingest, recomputed by analytics.refresh_analytics
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'), primary_key=True)
+    date = db.Column(db.Date, nullable=False)  # day the metrics were computed for
+    price = db.Column(db.Float, nullable=False)  # price in effect on that day
+    price_date = db.Column(db.Date, nullable=False)  # when that price was posted
+    federal_price = db.Column(db.Float)
+    spread = db.Column(db.Float)  # price - federal_price
+    spread_30d = db.Column(db.Float)
+    mean_7d = db.Column(db.Float)
+    mean_30d = db.Column(db.Float)
+    volatility_30d = db.Column(db.Float)  # std dev of daily relative price changes
+    rank = db.Column(db.Integer, nullable=False)  # 1 is cheapest
+    rank_change = db.Column(db.Integer)  # places gained over the last week
+    vendor = db.relationship('Vendor')
+
+class VendorPriceRollup(db.Model):
+    # Price stats for one vendor over a day, week (starting Monday) or month bucket
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)  # 'day', 'week' or 'month'
+    bucket = db.Column(db.Date, primary_key=True)  # first day of the bucket
+    min_price = db.Column(db.Float, nullable=False)
+    max_price = db.Column(db.Float, nullable=False)
+    mean_price = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_vendor_rollup_bucket', 'granularity', 'bucket'),
+    )
+
+class ZonePriceRollup(db.Model):
+    # Price stats across every vendor of a zone over a day, week or month bucket
+    zone = db.Column(db.String(100), primary_key=True)
+    granularity = db.Column(db.String(5), primary_key=True)
+    bucket = db.Column(db.Date, primary_key=True)
+    min_price = db.Column(db.Float, nullable=False)
+    max_price = db.Column(db.Float, nullable=False)
+    mean_price = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+class FederalSeries(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    code = db.Column(db.String(50), unique=True, nullable=False)  # EIA series id, e.g. 'W_EPD2F_PRS_SRI_DPG'
+    route = db.Column(db.String(100), nullable=False, default='petroleum/pri/wfr')  # EIA v2 dataset route
+    frequency = db.Column(db.String(20), nullable=False, default='weekly')
+    name = db.Column(db.String(200))
+    prices = db.relationship('FederalPriceData', back_populates='series')
+
 class FederalPriceData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False, unique=True)
+    series_id = db.Column(db.Integer, db.ForeignKey('federal_series.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
     price = db.Column(db.Float, nullable=False)
+    # Data version of the fetch that last wrote the row, for delta sync
+    version = db.Column(db.Integer, nullable=False, default=0)
+    series = db.relationship('FederalSeries', back_populates='prices')
+
+    __table_args__ = (
+        db.UniqueConstraint('series_id', 'date', name='uq_federal_series_date'),
+        db.Index('idx_federal_price_version', 'version'),
+    )
+
+class ZoneState(db.Model):
+    # Validators and price table fingerprint from the last ingested fetch of a zone page
+    zone = db.Column(db.String(100), primary_key=True)
+    etag = db.Column(db.String(200))
+    last_modified = db.Column(db.String(100))
+    table_hash = db.Column(db.String(64))
+    updated_at = db.Column(db.DateTime)
+
+class DataVersion(db.Model):
+    # Single row counter bumped by every ingest that changes price data
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+class JobSchedule(db.Model):
+    # Whether a scheduled job may run; missing rows mean enabled
+    job_id = db.Column(db.String(50), primary_key=True)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+
+class Job(db.Model):
+    # A scrape, federal fetch or alert delivery queued for the background worker
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(10), nullable=False)  # 'Local', 'Federal' or 'Alerts'
+    status = db.Column(db.String(10), nullable=False, default='queued')  # 'queued', 'running', 'succeeded' or 'failed'
+    stage = db.Column(db.String(20))
+    scheduled = db.Column(db.Boolean, nullable=False, default=False)
+    message = db.Column(db.Text)
+    timings = db.Column(db.Text)  # JSON {stage: seconds}
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # At most one pending job per type; further triggers merge into it
+        db.Index(
+            'uq_job_active_type', 'job_type', unique=True,
+            sqlite_where=db.text("status IN ('queued', 'running')"),
+            postgresql_where=db.text("status IN ('queued', 'running')"),
+        ),
+        db.Index('idx_job_status', 'status'),
+    )
+
+class ImportProgress(db.Model):
+    # How far `flask import-prices` got through each file, so an interrupted import can resume
+    path = db.Column(db.String(500), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime = db.Column(db.Float, nullable=False)
+    rows_done = db.Column(db.Integer, nullable=False, default=0)  # input records committed so far
+    finished = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
 
 class ScrapeLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -38,4 +173,121 @@ class ScrapeLog(db.Model):
     success = db.Column(db.Boolean, nullable=False)
     message = db.Column(db.Text)
     scheduled = db.Column(db.Boolean, nullable=False)
-    scrape_type = db.Column(db.String(10), nullable=False)  # 'Local' or 'Federal'
\ No newline at end of file
+    scrape_type = db.Column(db.String(10), nullable=False)  # 'Local' or 'Federal'
+    duration = db.Column(db.Float)  # seconds
+    # Seconds spent in each stage of the run; federal fetches have no separate parse stage
+    fetch_seconds = db.Column(db.Float)
+    parse_seconds = db.Column(db.Float)
+    write_seconds = db.Column(db.Float)
+    artifacts = db.relationship('ScrapeArtifact', back_populates='scrape_log')
+
+    __table_args__ = (
+        # Keyset pagination walks (timestamp, id), optionally within one scrape_type
+        db.Index('idx_scrape_log_timestamp', 'timestamp', 'id'),
+        db.Index('idx_scrape_log_type_timestamp', 'scrape_type', 'timestamp', 'id'),
+    )
+
+class ScrapeArtifact(db.Model):
+    # A page or API response a scrape downloaded, stored in the archive under its SHA-256
+    id = db.Column(db.Integer, primary_key=True)
+    # Cleared when the log entry is compacted away; the archived body is kept
+    scrape_log_id = db.Column(db.Integer, db.ForeignKey('scrape_log.id', ondelete='SET NULL'))
+    source = db.Column(db.String(10), nullable=False)  # 'Local' or 'Federal'
+    key = db.Column(db.String(100), nullable=False)  # zone, or federal series code
+    url = db.Column(db.Text, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)  # uncompressed bytes
+    fetched_at = db.Column(db.DateTime, nullable=False)
+    scrape_log = db.relationship('ScrapeLog', back_populates='artifacts')
+
+    __table_args__ = (
+        db.Index('idx_scrape_artifact_log', 'scrape_log_id'),
+        db.Index('idx_scrape_artifact_source_fetched', 'source', 'fetched_at'),
+    )
+
+class ScrapeLogDaily(db.Model):
+    # ScrapeLog entries past the retention period, rolled up per day
+    day = db.Column(db.Date, primary_key=True)
+    scrape_type = db.Column(db.String(10), primary_key=True)
+    scheduled = db.Column(db.Boolean, primary_key=True)
+    runs = db.Column(db.Integer, nullable=False)
+    failures = db.Column(db.Integer, nullable=False)
+    timed_runs = db.Column(db.Integer, nullable=False, default=0)  # runs that recorded a duration
+    total_duration = db.Column(db.Float, nullable=False, default=0)
+
+class AlertRule(db.Model):
+    # A user's price alert: 'below' fires when a price drops under threshold, 'under_federal'
+    # when it is more than threshold below the federal average. Scoped to a vendor, a town or all vendors.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    threshold = db.Column(db.Float, nullable=False)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'))
+    town = db.Column(db.String(100))
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    vendor = db.relationship('Vendor')
+
+    __table_args__ = (
+        db.Index('idx_alert_rule_user', 'user_id'),
+    )
+
+class AlertOutbox(db.Model):
+    # A fired alert waiting for (or done with) delivery; a rule fires once per vendor and price date
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('alert_rule.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendor.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    federal_price = db.Column(db.Float)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # 'pending', 'sent' or 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    delivered_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('rule_id', 'vendor_id', 'date', name='uq_alert_outbox_rule_vendor_date'),
+        db.Index('idx_alert_outbox_status', 'status', 'id'),
+        db.Index('idx_alert_outbox_user', 'user_id', 'id'),
+    )
+
+def upsert(model, rows, index_elements, update_columns):
+    """Write rows with a single INSERT .. ON CONFLICT DO UPDATE statement.
+
+    Rows whose index_elements already exist have update_columns overwritten
+    with the incoming values (or are left alone if update_columns is
+    empty); everything else is inserted.
+    """
+    if not rows:
+        return
+    if db.session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(model.__table__)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: stmt.excluded[column] for column in update_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    db.session.execute(stmt, rows)
+
+def bump_data_version():
+    """Advance the data version and return it; call inside the ingest transaction that changed data."""
+    table = DataVersion.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == 1)
+        .values(version=table.c.version + 1, updated_at=datetime.now())
+    )
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(id=1, version=1, updated_at=datetime.now()))
+    return current_data_version()
+
+def current_data_version():
+    return db.session.execute(db.select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0
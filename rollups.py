@@ -0,0 +1,148 @@
+"""Day/week/month price aggregates per vendor and per zone.
+
+Rollups are refreshed bucket by bucket from PriceData for whatever the
+ingest just wrote, inside the ingest transaction, so a bucket always
+matches the raw rows it covers even when a price is revised.
+"""
+from datetime import timedelta
+import logging
+from sqlalchemy import select
+from models import db, Vendor, PriceData, VendorPriceRollup, ZonePriceRollup, upsert, bump_data_version
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# Aim for no more than this many points per series on a trends chart
+MAX_BUCKETS = 200
+
+BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 30}
+
+def bucket_start(date, granularity):
+    if granularity == 'week':
+        return date - timedelta(days=date.weekday())
+    if granularity == 'month':
+        return date.replace(day=1)
+    return date
+
+def bucket_end(start, granularity):
+    """First day after the bucket starting at start."""
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+def choose_granularity(days):
+    """Finest granularity that keeps a window of days under MAX_BUCKETS points."""
+    for granularity in GRANULARITIES:
+        if days / BUCKET_DAYS[granularity] <= MAX_BUCKETS:
+            return granularity
+    return GRANULARITIES[-1]
+
+def aggregate(rows, touched=None):
+    """Fold (key, date, price) rows into {(key, granularity, bucket): stats} for touched buckets only (all if None)."""
+    stats = {}
+    for key, date, price in rows:
+        for granularity in GRANULARITIES:
+            bucket_key = (key, granularity, bucket_start(date, granularity))
+            if touched is not None and bucket_key not in touched:
+                continue
+            entry = stats.get(bucket_key)
+            if entry is None:
+                stats[bucket_key] = [price, price, price, 1]
+            else:
+                entry[0] = min(entry[0], price)
+                entry[1] = max(entry[1], price)
+                entry[2] += price
+                entry[3] += 1
+    return stats
+
+def rollup_rows(key_name, stats):
+    return [
+        {
+            key_name: key,
+            'granularity': granularity,
+            'bucket': bucket,
+            'min_price': low,
+            'max_price': high,
+            'mean_price': total / count,
+            'count': count,
+        }
+        for (key, granularity, bucket), (low, high, total, count) in stats.items()
+    ]
+
+def refresh_rollups(prices):
+    """Recompute every rollup bucket touched by prices, an iterable of {'vendor_id', 'date'} rows.
+
+    Does not commit; callers run this inside their ingest transaction.
+    """
+    vendor_buckets = set()
+    for row in prices:
+        for granularity in GRANULARITIES:
+            vendor_buckets.add((row['vendor_id'], granularity, bucket_start(row['date'], granularity)))
+    if not vendor_buckets:
+        return
+
+    vendor_ids = {vendor_id for vendor_id, _, _ in vendor_buckets}
+    low = min(bucket for _, _, bucket in vendor_buckets)
+    high = max(bucket_end(bucket, granularity) for _, granularity, bucket in vendor_buckets)
+
+    zones = dict(db.session.execute(select(Vendor.id, Vendor.zone).where(Vendor.id.in_(vendor_ids))).all())
+    zone_buckets = {
+        (zones[vendor_id], granularity, bucket)
+        for vendor_id, granularity, bucket in vendor_buckets
+        if zones.get(vendor_id) is not None
+    }
+
+    vendor_rows = db.session.execute(
+        select(PriceData.vendor_id, PriceData.date, PriceData.price)
+        .where(PriceData.vendor_id.in_(vendor_ids), PriceData.date >= low, PriceData.date < high)
+    ).all()
+    vendor_stats = aggregate(vendor_rows, vendor_buckets)
+    upsert(VendorPriceRollup, rollup_rows('vendor_id', vendor_stats), ['vendor_id', 'granularity', 'bucket'],
+           ['min_price', 'max_price', 'mean_price', 'count'])
+
+    if zone_buckets:
+        zone_rows = db.session.execute(
+            select(Vendor.zone, PriceData.date, PriceData.price)
+            .join(Vendor, Vendor.id == PriceData.vendor_id)
+            .where(Vendor.zone.in_({zone for zone, _, _ in zone_buckets}), PriceData.date >= low, PriceData.date < high)
+        ).all()
+        zone_stats = aggregate(zone_rows, zone_buckets)
+        upsert(ZonePriceRollup, rollup_rows('zone', zone_stats), ['zone', 'granularity', 'bucket'],
+               ['min_price', 'max_price', 'mean_price', 'count'])
+
+    logger.info(f"Refreshed {len(vendor_buckets)} vendor and {len(zone_buckets)} zone rollup buckets")
+
+def rebuild_rollups(batch_size=50):
+    """Recompute all rollups from PriceData, a batch of vendors or one zone per transaction.
+
+    Every bucket is rebuilt, so this reads each price once per table
+    rather than going through refresh_rollups' touched-bucket lookups.
+    """
+    columns = ['min_price', 'max_price', 'mean_price', 'count']
+    vendor_ids = db.session.execute(select(Vendor.id).order_by(Vendor.id)).scalars().all()
+    for i in range(0, len(vendor_ids), batch_size):
+        rows = db.session.execute(
+            select(PriceData.vendor_id, PriceData.date, PriceData.price)
+            .where(PriceData.vendor_id.in_(vendor_ids[i:i + batch_size]))
+            .execution_options(yield_per=10000)
+        )
+        upsert(VendorPriceRollup, rollup_rows('vendor_id', aggregate(rows)), ['vendor_id', 'granularity', 'bucket'], columns)
+        db.session.commit()
+
+    zones = db.session.execute(select(Vendor.zone).where(Vendor.zone.is_not(None)).distinct()).scalars().all()
+    for zone in zones:
+        rows = db.session.execute(
+            select(Vendor.zone, PriceData.date, PriceData.price)
+            .join(Vendor, Vendor.id == PriceData.vendor_id)
+            .where(Vendor.zone == zone)
+            .execution_options(yield_per=10000)
+        )
+        upsert(ZonePriceRollup, rollup_rows('zone', aggregate(rows)), ['zone', 'granularity', 'bucket'], columns)
+        db.session.commit()
+
+    bump_data_version()
+    db.session.commit()
+    return len(vendor_ids)
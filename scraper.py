@@ -1,14 +1,74 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+import hashlib
 import logging
-from models import db, Vendor, PriceData
+import re
+from sqlalchemy import select
+from models import db, Vendor, PriceData, ZoneState, upsert, bump_data_version
+from extractors import get_extractor
+from rollups import refresh_rollups
+from latest import refresh_latest_prices
+from analytics import refresh_analytics
+from alerts import evaluate_alerts
+from archive import archive_response
+
+# Table tags, plus the comments and script/style blocks whose contents are not markup
+TABLE_SCAN = re.compile(
+    rb'<!--.*?(?:-->|\Z)|<(script|style)\b.*?(?:</\1\s*>|\Z)|<(?P<close>/?)(?P<table>table)\b',
+    re.IGNORECASE | re.DOTALL,
+)
+
+def first_table_markup(content):
+    """Return the raw bytes of the first <table> element in content, or None.
+
+    This is a cheap byte scan (nested tables are tracked by depth), used to
+    fingerprint the price table without building a parse tree. Like the
+    extractors, it passes over tables inside comments and script or style
+    blocks, so it fingerprints the table they read.
+    """
+    depth = 0
+    start = None
+    for match in TABLE_SCAN.finditer(content):
+        if match.group('table') is None:
+            continue
+        if not match.group('close'):
+            if start is None:
+                start = match.start()
+            depth += 1
+        elif start is not None:
+            depth -= 1
+            if depth == 0:
+                end = content.find(b'>', match.end())
+                return content[start:end + 1 if end != -1 else len(content)]
+    return content[start:] if start is not None else None
 
 class Scraper:
-    def __init__(self):
-        self.url = "https://www.newenglandoil.com/rhodeisland/zone4.asp?x=0"
+    def __init__(self, zones=None, base_url="https://www.newenglandoil.com", max_workers=8, timeout=20, parser='auto',
+                 price_deltas=True, benchmark_series=None, archive=None):
+        # Zones are newenglandoil.com page paths such as 'rhodeisland/zone4'
+        self.zones = list(zones or ['rhodeisland/zone4'])
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.extract_rows = get_extractor(parser)
+        self.price_deltas = price_deltas
+        # EIA series code vendor spreads are measured against
+        self.benchmark_series = benchmark_series
+        # PageArchive that keeps every downloaded page, if any
+        self.archive = archive
         self.logger = logging.getLogger(__name__)
 
+        # One pooled session shared by all fetch threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def zone_url(self, zone):
+        return f"{self.base_url}/{zone}.asp?x=0"
+
     def parse_date(self, date_str):
         if not date_str or date_str == '\xa0':
             return None
@@ -29,56 +89,190 @@ class Scraper:
             self.logger.warning(f"Could not parse price: {price_str}")
             return None
 
-    def scrape(self):
-        self.logger.info(f"Starting scrape from URL: {self.url}")
-        response = requests.get(self.url)
-        self.logger.info(f"Request status code: {response.status_code}")
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        self.logger.info("Successfully parsed HTML content")
-        
-        table = soup.find('table')
-        if not table:
-            self.logger.error("Could not find the price table")
-            raise Exception("Could not find the oil prices table")
-
-        rows = table.find_all('tr')[1:]  # Skip the header row
-        self.logger.info(f"Found {len(rows)} data rows")
-        
-        for i, row in enumerate(rows, start=1):
-            columns = row.find_all('td')
+    def parse_rows(self, rows, zone):
+        """Parse the extracted table rows into (zone, company, town, price, date) records."""
+        rows = rows[1:]  # Skip the header row
+        self.logger.info(f"Found {len(rows)} data rows for {zone}")
+
+        records = []
+        for i, columns in enumerate(rows, start=1):
             if len(columns) >= 6:
-                company_name = columns[0].text.strip()
-                town = columns[1].text.strip()
-                price = self.parse_price(columns[2].text.strip())
-                date_cell = columns[4]  # The date is in the 5th column (index 4)
-                date_str = date_cell.text.strip()
+                company_name = columns[0]
+                town = columns[1]
+                price = self.parse_price(columns[2])
+                date_str = columns[4]  # The date is in the 5th column (index 4)
                 date = self.parse_date(date_str)
 
-                self.logger.info(f"Processing row {i}: Company: {company_name}, Town: {town}, Price: {price}, Raw Date: '{date_str}', Parsed Date: {date}")
+                self.logger.debug(f"Processing row {i}: Company: {company_name}, Town: {town}, Price: {price}, Raw Date: '{date_str}', Parsed Date: {date}")
 
                 if price is not None and date is not None:
-                    # Check if vendor exists, if not create a new one
-                    vendor = Vendor.query.filter_by(name=company_name).first()
-                    if not vendor:
-                        vendor = Vendor(name=company_name, town=town)
-                        db.session.add(vendor)
-                        db.session.commit()
-                        self.logger.info(f"Created new vendor: {company_name}")
-
-                    # Check if price data already exists for this vendor and date
-                    existing_price = PriceData.query.filter_by(vendor_id=vendor.id, date=date).first()
-                    if existing_price:
-                        self.logger.info(f"Price data already exists for {company_name} on {date}. Updating.")
-                        existing_price.price = price
-                    else:
-                        # Add new price data
-                        price_data = PriceData(vendor_id=vendor.id, price=price, date=date)
-                        db.session.add(price_data)
-                        self.logger.info(f"Added new price data for {company_name}: {price} on {date}")
+                    records.append((zone, company_name, town, price, date))
                 else:
                     self.logger.warning(f"Skipping row {i} due to missing price or date. Price: {price}, Date: {date}")
+        return records
+
+    def resolve_vendors(self, records):
+        """Map each (zone, vendor name) in records to a vendor id, creating missing vendors in bulk."""
+        vendors = {}
+        for zone, company_name, town, _, _ in records:
+            vendors.setdefault((zone, company_name), {'name': company_name, 'town': town, 'zone': zone})
+
+        def lookup():
+            return {
+                (zone, name): vendor_id
+                for zone, name, vendor_id in db.session.execute(
+                    select(Vendor.zone, Vendor.name, Vendor.id).where(Vendor.name.in_({name for _, name in vendors}))
+                )
+                if (zone, name) in vendors
+            }
+
+        vendor_ids = lookup()
+        new_vendors = [vendor for key, vendor in vendors.items() if key not in vendor_ids]
+        if new_vendors:
+            # Upserted against the unique (zone, name), so a vendor another process just created is reused
+            upsert(Vendor, new_vendors, ['zone', 'name'], [])
+            vendor_ids = lookup()
+            self.logger.info(f"Created {len(new_vendors)} new vendors: {', '.join(vendor['name'] for vendor in new_vendors)}")
+
+        return vendor_ids
+
+    def write_prices(self, records):
+        """Upsert parsed records into PriceData with one vendor lookup and one bulk statement.
+
+        Only the raw prices are written, stamped with a freshly bumped data
+        version, and nothing is committed. Returns the {(vendor_id, date): row}
+        dict that was upserted.
+        """
+        vendor_ids = self.resolve_vendors(records)
+        version = bump_data_version()
+
+        # Keyed on the unique (vendor, date) pair so a repeated row can't conflict with itself
+        prices = {}
+        for zone, company_name, _, price, date in records:
+            vendor_id = vendor_ids[(zone, company_name)]
+            prices[(vendor_id, date)] = {'vendor_id': vendor_id, 'price': price, 'date': date, 'version': version}
+
+        upsert(PriceData, list(prices.values()), ['vendor_id', 'date'], ['price', 'version'])
+        return prices
+
+    def ingest(self, records):
+        """Write parsed records and everything derived from them in one transaction."""
+        if not records:
+            db.session.commit()
+            return 0
 
+        prices = self.write_prices(records)
+        refresh_rollups(prices.values())
+        refresh_latest_prices(prices.values(), with_deltas=self.price_deltas)
+        refresh_analytics(self.benchmark_series)
+        evaluate_alerts(prices.values(), self.benchmark_series)
         db.session.commit()
-        self.logger.info("Successfully committed all changes to database")
-        self.logger.info("Scraping completed successfully")
\ No newline at end of file
+        self.logger.info(f"Upserted {len(prices)} price rows")
+        return len(prices)
+
+    def fetch(self, zone, state=None):
+        url = self.zone_url(zone)
+        headers = {}
+        # Let the site answer 304 Not Modified when it supports validators
+        if state is not None and state.etag:
+            headers['If-None-Match'] = state.etag
+        if state is not None and state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+        self.logger.info(f"Fetching {zone} from URL: {url}")
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        self.logger.info(f"Request status code for {zone}: {response.status_code}")
+        response.raise_for_status()
+        return response
+
+    def extract(self, content, zone):
+        rows = self.extract_rows(content)
+        if rows is None:
+            self.logger.error(f"Could not find the price table for {zone}")
+            raise Exception(f"Could not find the oil prices table for {zone}")
+        return self.parse_rows(rows, zone)
+
+    def scrape(self, progress=None, artifacts=None):
+        """Fetch every configured zone concurrently, then ingest all of them in one transaction.
+
+        Zones answering 304 Not Modified, or whose price table hashes the same
+        as last time, are skipped without parsing or writing any prices.
+        progress, if given, is called with 'fetch', 'parse' and 'write' as
+        each stage starts; all of them come before the first write.
+
+        With an archive, each page downloaded is stored in it and its
+        ScrapeArtifact row appended to artifacts, if given, even when the
+        scrape then fails.
+
+        Returns a summary dict with the zones scraped, the zones skipped as
+        unchanged, the number of price rows written and a {zone: error} map of
+        zones that failed.
+        """
+        progress = progress or (lambda stage: None)
+        self.logger.info(f"Starting scrape of {len(self.zones)} zone(s)")
+        states = {state.zone: state for state in ZoneState.query.filter(ZoneState.zone.in_(self.zones))}
+        responses = {}
+        records = []
+        scraped = []
+        unchanged = []
+        failed = {}
+        state_rows = []
+        artifacts = [] if artifacts is None else artifacts
+
+        progress('fetch')
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.zones))) as pool:
+            futures = {pool.submit(self.fetch, zone, states.get(zone)): zone for zone in self.zones}
+            for future in as_completed(futures):
+                zone = futures[future]
+                try:
+                    responses[zone] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error scraping {zone}: {str(e)}", exc_info=True)
+                    failed[zone] = str(e)
+
+        progress('parse')
+        for zone, response in responses.items():
+            state = states.get(zone)
+            try:
+                if response.status_code == 304:
+                    self.logger.info(f"{zone} not modified since last scrape, skipping")
+                    unchanged.append(zone)
+                    continue
+                if self.archive is not None:
+                    archive_response(self.archive, 'Local', zone, response, artifacts)
+
+                table = first_table_markup(response.content)
+                table_hash = hashlib.sha256(table).hexdigest() if table is not None else None
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+
+                if state is not None and table_hash is not None and state.table_hash == table_hash:
+                    self.logger.info(f"Price table for {zone} is unchanged, skipping")
+                    unchanged.append(zone)
+                else:
+                    records.extend(self.extract(response.content, zone))
+                    scraped.append(zone)
+
+                if state is None or (state.table_hash, state.etag, state.last_modified) != (table_hash, etag, last_modified):
+                    state_rows.append({
+                        'zone': zone,
+                        'etag': etag,
+                        'last_modified': last_modified,
+                        'table_hash': table_hash,
+                        'updated_at': datetime.now(),
+                    })
+            except Exception as e:
+                self.logger.error(f"Error scraping {zone}: {str(e)}", exc_info=True)
+                failed[zone] = str(e)
+
+        if not scraped and not unchanged:
+            raise Exception(f"All zones failed: {'; '.join(f'{zone}: {error}' for zone, error in failed.items())}")
+
+        progress('write')
+        rows = 0
+        if scraped or state_rows:
+            # Zone state is saved in the same transaction as the prices it describes
+            upsert(ZoneState, state_rows, ['zone'], ['etag', 'last_modified', 'table_hash', 'updated_at'])
+            rows = self.ingest(records)
+            self.logger.info("Successfully committed all changes to database")
+        self.logger.info("Scraping completed successfully")
+        return {'zones': scraped, 'unchanged': unchanged, 'rows': rows, 'failed': failed}
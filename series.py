@@ -0,0 +1,66 @@
+"""Price series queries behind /api/prices/series.
+
+Date ranges, vendor and zone filters and top-N ranking all run in SQL.
+PriceData reads are range scans of idx_price_vendor_date_price, which holds
+every column they need, so they are answered from the index alone.
+"""
+from sqlalchemy import select, func, and_
+from models import Vendor, PriceData, LatestPrice
+from database import read_db
+from charts import epoch_day
+
+RANK_BY = ('latest', 'average')
+
+def restrict(query, vendor_column, vendor_ids=None, zone=None):
+    if vendor_ids is not None:
+        query = query.where(vendor_column.in_(vendor_ids))
+    if zone:
+        query = query.where(vendor_column.in_(select(Vendor.id).where(Vendor.zone == zone)))
+    return query
+
+def rank_vendors(start, end, top_n, rank_by='latest', vendor_ids=None, zone=None, today=None):
+    """The top_n cheapest vendors priced within [start, end] as [(vendor_id, price)], cheapest first.
+
+    'latest' ranks by each vendor's newest price in the range, read from
+    LatestPrice when the range runs up to today; 'average' by the mean
+    price over the range.
+    """
+    if rank_by == 'average':
+        price = func.avg(PriceData.price)
+        query = (
+            select(PriceData.vendor_id, price.label('price'))
+            .where(PriceData.date >= start, PriceData.date <= end)
+            .group_by(PriceData.vendor_id)
+        )
+        query = restrict(query, PriceData.vendor_id, vendor_ids, zone).order_by(price, PriceData.vendor_id)
+    elif today is not None and end >= today:
+        query = select(LatestPrice.vendor_id, LatestPrice.price).where(LatestPrice.date >= start)
+        query = restrict(query, LatestPrice.vendor_id, vendor_ids, zone).order_by(LatestPrice.price, LatestPrice.vendor_id)
+    else:
+        newest = restrict(
+            select(PriceData.vendor_id, func.max(PriceData.date).label('date'))
+            .where(PriceData.date >= start, PriceData.date <= end)
+            .group_by(PriceData.vendor_id),
+            PriceData.vendor_id, vendor_ids, zone,
+        ).subquery()
+        query = (
+            select(PriceData.vendor_id, PriceData.price)
+            .join(newest, and_(PriceData.vendor_id == newest.c.vendor_id, PriceData.date == newest.c.date))
+            .order_by(PriceData.price, PriceData.vendor_id)
+        )
+    return [(row.vendor_id, float(row.price)) for row in read_db.session.execute(query.limit(top_n))]
+
+def price_series(start, end, vendor_ids=None, zone=None):
+    """Daily prices within [start, end] as {vendor_id: (epoch days, prices)}."""
+    query = restrict(
+        select(PriceData.vendor_id, PriceData.date, PriceData.price)
+        .where(PriceData.date >= start, PriceData.date <= end),
+        PriceData.vendor_id, vendor_ids, zone,
+    ).order_by(PriceData.vendor_id, PriceData.date)
+
+    series = {}
+    for row in read_db.session.execute(query):
+        days, prices = series.setdefault(row.vendor_id, ([], []))
+        days.append(epoch_day(row.date))
+        prices.append(float(row.price))
+    return series
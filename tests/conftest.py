@@ -0,0 +1,21 @@
+"""Shared test setup: run with `python -m pytest` from the repository root."""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Point app.py at scratch storage before any test imports it
+WORKDIR = tempfile.mkdtemp(prefix='etrends-tests-')
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{os.path.join(WORKDIR, 'test.db')}",
+    CACHE_PATH=os.path.join(WORKDIR, 'cache.db'),
+    METRICS_PATH=os.path.join(WORKDIR, 'metrics.db'),
+    ARCHIVE_DIR=os.path.join(WORKDIR, 'archive'),
+    SCHEDULER_LOCK_PATH=os.path.join(WORKDIR, 'scheduler.lock'),
+    SCHEDULER_ENABLED='false',
+)
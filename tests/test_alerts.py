@@ -0,0 +1,81 @@
+"""Alert rules fire on crossings, once per vendor and price date."""
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from app import app
+from alerts import RuleIndex, evaluate_alerts
+from latest import refresh_latest_prices
+from models import db, User, Vendor, PriceData, AlertRule, AlertOutbox, upsert
+
+TODAY = date(2026, 1, 5)
+
+def rule(rule_id, kind, threshold, vendor_id=None, town=None):
+    return SimpleNamespace(id=rule_id, user_id=1, kind=kind, threshold=threshold, vendor_id=vendor_id, town=town)
+
+def fired(index, price, previous_price=None, federal_price=None, previous_federal_price=None):
+    return sorted(index.matches(1, 'Warwick', price, federal_price, previous_price, previous_federal_price))
+
+def test_below_fires_when_price_falls_through_threshold():
+    index = RuleIndex([rule(1, 'below', 3.0), rule(2, 'below', 2.5, vendor_id=1), rule(3, 'below', 3.5, town=' warwick ')])
+    assert fired(index, 2.9, previous_price=3.2) == [1]
+    assert fired(index, 2.4, previous_price=3.2) == [1, 2]
+    # Already below, or rising back up: nothing new
+    assert fired(index, 2.8, previous_price=2.9) == []
+    assert fired(index, 3.2, previous_price=2.4) == []
+    # A first price fires every rule it meets
+    assert fired(index, 2.9) == [1, 3]
+
+def test_under_federal_fires_when_gap_widens_past_margin():
+    index = RuleIndex([rule(1, 'under_federal', 0.25), rule(2, 'under_federal', 0.5)])
+    assert fired(index, 3.0, previous_price=3.2, federal_price=3.3, previous_federal_price=3.3) == [1]
+    assert fired(index, 2.7, previous_price=3.2, federal_price=3.3, previous_federal_price=3.3) == [1, 2]
+    # The gap narrowing back is not a crossing
+    assert fired(index, 3.2, previous_price=2.7, federal_price=3.3, previous_federal_price=3.3) == []
+    # The federal price moving can cross it too
+    assert fired(index, 3.0, previous_price=3.0, federal_price=3.3, previous_federal_price=3.2) == [1]
+    assert fired(index, 3.0, federal_price=None) == []
+
+@pytest.fixture
+def store():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(id=1, username='tester', password_hash='-'))
+        db.session.add(Vendor(id=1, name='Dime Oil', town='Warwick', zone='rhodeisland/zone4'))
+        db.session.add(AlertRule(id=1, user_id=1, kind='below', threshold=3.0, vendor_id=1, created_at=datetime.now()))
+        db.session.commit()
+        yield
+        db.session.remove()
+
+def ingest(prices, with_deltas=True):
+    """Write prices, a list of (days before TODAY, price), the way Scraper.ingest does. Returns the alerts fired."""
+    rows = [{'vendor_id': 1, 'date': TODAY - timedelta(days=days), 'price': price} for days, price in prices]
+    upsert(PriceData, rows, ['vendor_id', 'date'], ['price'])
+    refresh_latest_prices(rows, with_deltas=with_deltas)
+    count = evaluate_alerts(rows, today=TODAY)
+    db.session.commit()
+    return count
+
+def outbox():
+    return db.session.execute(db.select(AlertOutbox.date, AlertOutbox.price).order_by(AlertOutbox.date)).all()
+
+@pytest.mark.parametrize('with_deltas', [True, False])
+def test_only_crossings_fire(store, with_deltas):
+    assert ingest([(3, 3.2)], with_deltas) == 0
+    assert ingest([(2, 2.9)], with_deltas) == 1
+    # Staying below the threshold does not fire again
+    assert ingest([(1, 2.8)], with_deltas) == 0
+    assert outbox() == [(TODAY - timedelta(days=2), 2.9)]
+
+def test_rescraped_price_fires_once(store):
+    ingest([(2, 3.2)])
+    assert ingest([(1, 2.9)]) == 1
+    ingest([(1, 2.9)])
+    ingest([(1, 2.9)])
+    assert outbox() == [(TODAY - timedelta(days=1), 2.9)]
+
+def test_backfilled_price_does_not_fire(store):
+    ingest([(1, 3.2)])
+    # Older than the vendor's current price, so not a price move
+    assert ingest([(4, 2.5)]) == 0
+    assert outbox() == []
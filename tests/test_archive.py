@@ -0,0 +1,15 @@
+"""Archived responses never record credentials."""
+from types import SimpleNamespace
+from archive import PageArchive, archive_response, redact_url
+
+def test_redact_url_drops_api_key():
+    url = 'https://api.eia.gov/v2/petroleum/pri/wfr/data/?api_key=SECRET&frequency=weekly&offset=0'
+    assert redact_url(url) == 'https://api.eia.gov/v2/petroleum/pri/wfr/data/?frequency=weekly&offset=0'
+    assert redact_url('https://www.newenglandoil.com/rhodeisland/zone4.asp') == 'https://www.newenglandoil.com/rhodeisland/zone4.asp'
+
+def test_artifact_url_is_redacted(tmp_path):
+    response = SimpleNamespace(content=b'{}', url='https://api.eia.gov/v2/data/?api_key=SECRET&length=5000')
+    artifacts = []
+    archive_response(PageArchive(str(tmp_path)), 'Federal', 'W_EPD2F_PRS_SRI_DPG', response, artifacts)
+    assert artifacts[0]['url'] == 'https://api.eia.gov/v2/data/?length=5000'
+    assert 'SECRET' not in str(artifacts)
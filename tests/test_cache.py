@@ -0,0 +1,26 @@
+"""ResponseCache entries and ETags belong to one build."""
+import os
+import shutil
+from flask import Flask
+from cache import ResponseCache, source_digest
+from conftest import WORKDIR
+
+def cache_for(salt):
+    app = Flask(__name__)
+    app.config.update(CACHE_PATH=os.path.join(WORKDIR, 'salted-cache.db'), CACHE_SALT=salt)
+    return ResponseCache(app)
+
+def test_entries_and_etags_do_not_survive_a_new_build():
+    old, new = cache_for('build-1'), cache_for('build-2')
+    old.set(old.key('trends', {'today': '2026-01-05'}), 7, {'vendors': ['Dime Oil']})
+
+    assert old.get(old.key('trends', {'today': '2026-01-05'}), 7) == {'vendors': ['Dime Oil']}
+    assert new.get(new.key('trends', {'today': '2026-01-05'}), 7) is None
+    assert old.etag(old.key('trends', {}), 7, 1) != new.etag(new.key('trends', {}), 7, 1)
+
+def test_source_digest_changes_with_templates(tmp_path):
+    shutil.copytree(os.path.join(os.path.dirname(__file__), 'fixtures', 'pages'), tmp_path / 'templates')
+    (tmp_path / 'app.py').write_text('app = None\n')
+    before = source_digest(str(tmp_path))
+    (tmp_path / 'templates' / 'rhodeisland_zone4.html').write_text('<table></table>')
+    assert source_digest(str(tmp_path)) != before
@@ -0,0 +1,34 @@
+"""LTTB downsampling of the /trends series."""
+import math
+import pytest
+from charts import lttb, downsample
+
+def series(n):
+    xs = list(range(n))
+    return xs, [3 + 0.2 * math.sin(x / 7) for x in xs]
+
+@pytest.mark.parametrize('n, threshold', [(10, 3), (100, 7), (365, 150), (1000, 999)])
+def test_lttb_keeps_ends_and_returns_threshold_points(n, threshold):
+    xs, ys = series(n)
+    indices = lttb(xs, ys, threshold)
+    assert len(indices) == threshold
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert indices == sorted(set(indices))
+
+def test_lttb_keeps_a_spike():
+    xs, ys = series(200)
+    ys[123] = 9.0
+    assert 123 in lttb(xs, ys, 20)
+
+@pytest.mark.parametrize('threshold', [50, 60, 2])
+def test_short_series_are_returned_whole(threshold):
+    xs, ys = series(50)
+    assert lttb(xs, ys, threshold) == list(range(50))
+
+def test_downsample_slices_days_and_prices_together():
+    xs, ys = series(100)
+    days, prices = downsample(xs, ys, 10)
+    assert len(days) == len(prices) == 10
+    assert (days[0], days[-1]) == (0, 99)
+    assert prices == [ys[day] for day in days]
+    assert downsample(xs, ys, None) == (xs, ys)
@@ -0,0 +1,57 @@
+"""Every table extraction backend must give BeautifulSoup's rows on saved zone pages."""
+import glob
+import os
+import pytest
+from conftest import FIXTURES
+from extractors import BACKENDS, etree, get_extractor
+from scraper import Scraper
+
+PAGES = sorted(glob.glob(os.path.join(FIXTURES, 'pages', '*.html')))
+
+# lxml closes unclosed <td> and <tr> elements where html.parser nests them
+LXML_DIFFERS = {'massachusetts_zone10.html', 'connecticut_zone1.html'}
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def cases():
+    for backend in BACKENDS:
+        if backend == 'bs4':
+            continue
+        for path in PAGES:
+            marks = []
+            if backend == 'lxml' and etree is None:
+                marks.append(pytest.mark.skip(reason='lxml is not installed'))
+            elif backend == 'lxml' and os.path.basename(path) in LXML_DIFFERS:
+                # Strict, so the day lxml matches this test fails and 'auto' can be reconsidered
+                marks.append(pytest.mark.xfail(strict=True, reason='lxml repairs unclosed cells and rows'))
+            yield pytest.param(backend, path, marks=marks, id=f"{backend}-{os.path.basename(path)}")
+
+@pytest.mark.parametrize('backend, path', list(cases()))
+def test_backend_matches_bs4(backend, path):
+    content = read(path)
+    assert BACKENDS[backend](content) == BACKENDS['bs4'](content)
+
+def test_auto_is_a_backend_matching_every_page():
+    extractor = get_extractor('auto')
+    for path in PAGES:
+        content = read(path)
+        assert extractor(content) == BACKENDS['bs4'](content), path
+
+def test_scraper_reads_saved_page():
+    records = Scraper(parser='auto').extract(read(os.path.join(FIXTURES, 'pages', 'rhodeisland_zone4.html')), 'rhodeisland/zone4')
+    # 24 dealers, 3 of them without a posted price
+    assert len(records) == 21
+    zone, company, town, price, date = records[0]
+    assert (zone, company, town) == ('rhodeisland/zone4', 'Affordable Fuel', 'West Warwick')
+    assert 3 < price < 4 and date.year == 2026
+
+def test_scraper_decodes_legacy_charset():
+    records = Scraper(parser='auto').extract(read(os.path.join(FIXTURES, 'pages', 'newhampshire_zone2.html')), 'newhampshire/zone2')
+    companies = {company for _, company, _, _, _ in records}
+    assert {'Café Fuel', 'Jack’s Discount Oil'} <= companies
+
+def test_page_without_table():
+    with pytest.raises(Exception, match='Could not find'):
+        Scraper(parser='auto').extract(read(os.path.join(FIXTURES, 'pages', 'maine_zone3.html')), 'maine/zone3')
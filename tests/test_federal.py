@@ -0,0 +1,94 @@
+"""fetch_federal_data against the local EIA stub: full, paginated, incremental and revised fetches."""
+from datetime import date, timedelta
+import pytest
+from benchmarks import stubs
+from app import app, fetch_federal_data, federal_fetcher
+from models import db, FederalSeries, FederalPriceData, current_data_version
+
+CODE = app.config['EIA_SERIES'][0]
+
+@pytest.fixture
+def eia(monkeypatch):
+    stub = stubs.EIAStub(end=date(2026, 1, 5))
+    server, base = stubs.start(stub)
+    monkeypatch.setattr(federal_fetcher, 'base_url', f"{base}/v2")
+    monkeypatch.setattr(federal_fetcher, 'page_size', 100)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield stub
+        db.session.remove()
+    server.shutdown()
+
+def stored():
+    return {
+        row.date: row.price
+        for row in db.session.execute(
+            db.select(FederalPriceData.date, FederalPriceData.price).join(FederalSeries).where(FederalSeries.code == CODE)
+        )
+    }
+
+def served(stub):
+    return {date.fromisoformat(point['period']): float(point['value']) for point in stub.points(CODE)}
+
+def add_week(stub, value):
+    points = stub.points(CODE)
+    day = date.fromisoformat(points[-1]['period']) + timedelta(weeks=1)
+    points.append({'period': day.isoformat(), 'series': CODE, 'value': value})
+    return day
+
+def test_first_fetch_pages_through_full_history(eia):
+    success, message = fetch_federal_data()
+    assert success, message
+    assert stored() == served(eia)
+    # 100 points per page, requested in offset order, without a start date
+    assert [int(query['offset'][0]) for query in eia.requests] == list(range(0, len(served(eia)), 100))
+    assert all('start' not in query for query in eia.requests)
+
+def test_incremental_fetch_starts_at_newest_week(eia):
+    fetch_federal_data()
+    latest = max(stored())
+    added = add_week(eia, '3.555')
+    eia.requests.clear()
+
+    success, message = fetch_federal_data()
+    assert success, message
+    assert message == 'Federal data updated. New: 1, Updated: 0'
+    assert [query['start'][0] for query in eia.requests] == [latest.isoformat()]
+    assert stored()[added] == 3.555
+    assert stored() == served(eia)
+
+def test_incremental_fetch_picks_up_revised_newest_week(eia):
+    fetch_federal_data()
+    eia.points(CODE)[-1]['value'] = '9.999'
+
+    success, message = fetch_federal_data()
+    assert message == 'Federal data updated. New: 0, Updated: 1'
+    assert stored()[max(stored())] == 9.999
+
+def test_full_refresh_picks_up_older_revisions(eia):
+    fetch_federal_data()
+    revised = eia.points(CODE)[10]
+    revised['value'] = '1.234'
+
+    # An incremental fetch only asks from the newest week on
+    assert fetch_federal_data()[1] == 'Federal data updated. New: 0, Updated: 0'
+    assert stored()[date.fromisoformat(revised['period'])] != 1.234
+
+    eia.requests.clear()
+    success, message = fetch_federal_data(full=True)
+    assert message == 'Federal data updated. New: 0, Updated: 1'
+    assert all('start' not in query for query in eia.requests)
+    assert stored() == served(eia)
+
+def test_unchanged_fetch_keeps_data_version(eia):
+    fetch_federal_data()
+    version = current_data_version()
+    assert fetch_federal_data()[0]
+    assert current_data_version() == version
+
+def test_failed_fetch_writes_nothing(eia, monkeypatch):
+    monkeypatch.setattr(federal_fetcher, 'base_url', 'http://127.0.0.1:9/v2')
+    success, message = fetch_federal_data()
+    assert not success and message.startswith('Error fetching federal data')
+    assert stored() == {}
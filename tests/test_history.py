@@ -0,0 +1,92 @@
+"""Scrape history keyset pages and compaction into daily summaries."""
+from datetime import date, datetime, timedelta
+import pytest
+from app import app
+from history import scrape_log_page, compact_scrape_logs
+from models import db, ScrapeLog, ScrapeLogDaily, ScrapeArtifact
+
+START = datetime(2026, 1, 1, 10)
+
+@pytest.fixture
+def store():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield
+        db.session.remove()
+
+def add_log(timestamp, scrape_type='Local', success=True, scheduled=False, duration=None):
+    log = ScrapeLog(timestamp=timestamp, success=success, scheduled=scheduled, scrape_type=scrape_type, duration=duration)
+    db.session.add(log)
+    db.session.flush()
+    return log.id
+
+def ids(logs):
+    return [log.id for log in logs]
+
+def test_keyset_pages_walk_both_ways(store):
+    # Pairs share a timestamp, so the id has to break ties at page edges
+    for i in range(8):
+        add_log(START + timedelta(hours=i // 2))
+    add_log(START + timedelta(hours=1), scrape_type='Federal')
+    db.session.commit()
+    newest_first = ids(db.session.execute(
+        db.select(ScrapeLog).where(ScrapeLog.scrape_type == 'Local').order_by(ScrapeLog.timestamp.desc(), ScrapeLog.id.desc())
+    ).scalars())
+
+    pages = []
+    logs, older, newer = scrape_log_page(scrape_type='Local', limit=3)
+    assert newer is None
+    pages.append(ids(logs))
+    while older:
+        logs, older, newer = scrape_log_page(scrape_type='Local', before=older, limit=3)
+        assert newer is not None
+        pages.append(ids(logs))
+    assert pages == [newest_first[0:3], newest_first[3:6], newest_first[6:8]]
+
+    # And back up from the last page with its newer cursor
+    back = []
+    while newer:
+        logs, older, newer = scrape_log_page(scrape_type='Local', after=newer, limit=3)
+        assert older is not None
+        back.append(ids(logs))
+    assert back == [newest_first[3:6], newest_first[0:3]]
+
+def test_page_edges_with_no_neighbours(store):
+    only = add_log(START)
+    db.session.commit()
+    assert scrape_log_page(limit=3) == ([db.session.get(ScrapeLog, only)], None, None)
+    logs, older, newer = scrape_log_page(before=f"{START.isoformat()}_{only}", limit=3)
+    assert (logs, older) == ([], None)
+    logs, older, newer = scrape_log_page(after=f"{START.isoformat()}_{only}", limit=3)
+    assert (logs, older, newer) == ([], None, None)
+    with pytest.raises(ValueError):
+        scrape_log_page(before='not-a-cursor')
+
+def test_compaction_adds_to_existing_summaries(store):
+    today = date(2026, 3, 1)
+    old_day = date(2026, 1, 10)
+    db.session.add(ScrapeLogDaily(day=old_day, scrape_type='Local', scheduled=True, runs=4, failures=1, timed_runs=3, total_duration=30.0))
+    morning = datetime.combine(old_day, datetime.min.time()) + timedelta(hours=6)
+    compacted = [
+        add_log(morning, scheduled=True, duration=10.0),
+        add_log(morning + timedelta(hours=1), scheduled=True, success=False),
+        add_log(morning + timedelta(hours=2), scrape_type='Federal', scheduled=True, duration=2.5),
+    ]
+    db.session.add(ScrapeArtifact(scrape_log_id=compacted[0], source='Local', key='z', url='http://x', sha256='0' * 64, size=1, fetched_at=morning))
+    # The cutoff is midnight starting the retention period; that day is kept whole
+    kept = add_log(datetime(2026, 1, 31))
+    db.session.commit()
+
+    assert compact_scrape_logs(30, today=today) == 3
+    summaries = {
+        (row.scrape_type, row.scheduled): (row.runs, row.failures, row.timed_runs, row.total_duration)
+        for row in ScrapeLogDaily.query.filter_by(day=old_day)
+    }
+    assert summaries == {('Local', True): (6, 2, 4, 40.0), ('Federal', True): (1, 0, 1, 2.5)}
+    assert ids(ScrapeLog.query.all()) == [kept]
+    assert ScrapeArtifact.query.one().scrape_log_id is None
+
+    # Running it again has nothing left to fold in
+    assert compact_scrape_logs(30, today=today) == 0
+    assert ScrapeLogDaily.query.filter_by(day=old_day, scrape_type='Local').one().runs == 6
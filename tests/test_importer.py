@@ -0,0 +1,99 @@
+"""flask import-prices: resuming interrupted imports and reading back `flask export prices` output."""
+import csv
+from datetime import date, timedelta
+import pytest
+from app import app, scraper
+from importer import Importer
+from models import db, Vendor, PriceData, ImportProgress
+
+ZONE = 'rhodeisland/zone4'
+
+@pytest.fixture
+def store():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield
+        db.session.remove()
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'vendor', 'town', 'price'])
+        writer.writerows(rows)
+
+def csv_rows(count, first=date(2026, 1, 1)):
+    return [((first + timedelta(days=i)).isoformat(), 'Dime Oil', 'Warwick', f"{3 + i / 100:.2f}") for i in range(count)]
+
+def stored():
+    return sorted(
+        (row.zone, row.name, row.town, row.date, row.price)
+        for row in db.session.execute(
+            db.select(Vendor.zone, Vendor.name, Vendor.town, PriceData.date, PriceData.price).join(PriceData)
+        )
+    )
+
+def test_interrupted_import_resumes_after_last_chunk(store, tmp_path, monkeypatch):
+    path = str(tmp_path / 'prices.csv')
+    write_csv(path, csv_rows(10))
+    importer = Importer(scraper, ZONE, chunk_size=3)
+
+    # The second chunk fails, as if the process died while writing it
+    write_prices = scraper.write_prices
+    calls = iter([write_prices])
+    def interrupt(records):
+        writer = next(calls, None)
+        if writer is None:
+            raise RuntimeError('killed')
+        return writer(records)
+    monkeypatch.setattr(scraper, 'write_prices', interrupt)
+    with pytest.raises(RuntimeError):
+        importer.import_file(path)
+    db.session.rollback()
+    progress = db.session.get(ImportProgress, path)
+    assert (progress.rows_done, progress.finished) == (3, False)
+    assert len(stored()) == 3
+
+    monkeypatch.setattr(scraper, 'write_prices', write_prices)
+    assert importer.import_file(path) == 7
+    db.session.expire_all()
+    progress = db.session.get(ImportProgress, path)
+    assert (progress.rows_done, progress.finished) == (10, True)
+    assert len(stored()) == 10
+
+    # A finished file is not read again
+    assert importer.import_file(path) == 0
+
+def test_changed_file_is_imported_from_the_start(store, tmp_path):
+    path = tmp_path / 'prices.csv'
+    write_csv(path, csv_rows(4))
+    importer = Importer(scraper, ZONE, chunk_size=3)
+    assert importer.import_file(str(path)) == 4
+
+    write_csv(path, csv_rows(6))
+    assert importer.import_file(str(path)) == 6
+    assert db.session.get(ImportProgress, str(path)).rows_done == 6
+    assert len(stored()) == 6
+
+def test_export_round_trips_through_import(store, tmp_path):
+    db.session.add_all([
+        Vendor(id=1, name='Dime Oil', town='Warwick', zone=ZONE),
+        Vendor(id=2, name='Dime Oil', town='Fall River', zone='massachusetts/zone10'),
+        Vendor(id=3, name='Ocean State, Inc.', town='Cranston', zone=ZONE),
+    ])
+    db.session.add_all([
+        PriceData(vendor_id=vendor_id, date=date(2026, 1, day), price=price)
+        for vendor_id, day, price in ((1, 2, 3.199), (1, 5, 3.249), (2, 2, 2.999), (3, 3, 3.1))
+    ])
+    db.session.commit()
+    before = stored()
+
+    path = str(tmp_path / 'export.csv')
+    result = app.test_cli_runner().invoke(args=['export', 'prices', '--output', path])
+    assert result.exit_code == 0, result.output
+    db.session.execute(db.delete(PriceData))
+    db.session.execute(db.delete(Vendor))
+    db.session.commit()
+
+    assert Importer(scraper, 'unused/zone').import_file(path) == 4
+    assert stored() == before
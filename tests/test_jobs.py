@@ -0,0 +1,81 @@
+"""JobQueue merging, claiming and recovery, and the Scrape page's worker notice."""
+from datetime import datetime
+import pytest
+import app as application
+from app import app, job_queue
+from leader import LeaderElection
+from models import db, User, Job
+
+@pytest.fixture
+def queue():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield job_queue
+        db.session.remove()
+
+def test_duplicate_enqueue_merges_into_queued_job(queue):
+    job, merged = queue.enqueue('Local')
+    assert not merged
+    again, merged = queue.enqueue('Local')
+    assert merged and again.id == job.id
+    # Another type queues on its own
+    assert not queue.enqueue('Federal')[1]
+    assert Job.query.count() == 2
+
+def test_enqueue_race_is_settled_by_unique_index(queue, monkeypatch):
+    winner = Job(job_type='Local', status='queued', scheduled=False, created_at=datetime.now())
+    db.session.add(winner)
+    db.session.commit()
+
+    # The other enqueuer's insert lands between this one's lookup and its own insert
+    lookups = iter([None])
+    active = queue.active
+    monkeypatch.setattr(queue, 'active', lambda job_type: next(lookups, None) or active(job_type))
+    job, merged = queue.enqueue('Local')
+    assert merged and job.id == winner.id
+    assert Job.query.count() == 1
+
+def test_claim_takes_oldest_queued_job_once(queue):
+    first, _ = queue.enqueue('Local')
+    queue.enqueue('Federal')
+    claimed = queue.claim()
+    assert claimed.id == first.id
+    assert db.session.get(Job, first.id).status == 'running'
+    # A running job is no longer merged into; a new trigger queues behind it
+    assert queue.enqueue('Local')[1]
+    assert queue.claim().job_type == 'Federal'
+
+def test_recover_fails_jobs_left_running(queue):
+    job, _ = queue.enqueue('Local')
+    queue.claim()
+    queued, _ = queue.enqueue('Federal')
+    queue.recover()
+
+    job = db.session.get(Job, job.id)
+    assert job.status == 'failed' and job.finished_at is not None
+    assert job.message == 'Interrupted: the worker running this job exited'
+    assert db.session.get(Job, queued.id).status == 'queued'
+    # The failed job no longer blocks a new one
+    assert not queue.enqueue('Local')[1]
+
+def test_held_reports_another_process_leading(tmp_path):
+    path = str(tmp_path / 'scheduler.lock')
+    leader = LeaderElection(path, on_elected=lambda: None)
+    observer = LeaderElection(path, on_elected=lambda: None)
+    assert not observer.held()
+    # Checking must not keep the lock from the real election
+    assert leader.try_acquire()
+    assert observer.held()
+    assert not observer.try_acquire()
+
+def test_scrape_page_warns_without_worker(queue, monkeypatch):
+    db.session.add(User(id=1, username='tester', password_hash='-'))
+    db.session.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+    # The tests run with SCHEDULER_ENABLED=false, so nothing holds the lock
+    assert 'No job worker is running' in client.get('/scrape').get_data(as_text=True)
+    monkeypatch.setattr(application.leader, 'held', lambda: True)
+    assert 'No job worker is running' not in client.get('/scrape').get_data(as_text=True)
@@ -0,0 +1,68 @@
+"""refresh_latest_prices folds new rows into LatestPrice exactly as a rebuild from PriceData would."""
+from datetime import date, timedelta
+import pytest
+from app import app
+from latest import refresh_latest_prices, rebuild_latest_prices
+from models import db, Vendor, PriceData, LatestPrice, upsert
+
+DAY = date(2026, 1, 5)
+
+@pytest.fixture
+def store():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([Vendor(id=1, name='Dime Oil', zone='z'), Vendor(id=2, name='Ocean State', zone='z')])
+        db.session.commit()
+        yield
+        db.session.remove()
+
+def snapshot():
+    return {
+        row.vendor_id: tuple(row)[1:]
+        for row in db.session.execute(
+            db.select(LatestPrice.vendor_id, LatestPrice.price, LatestPrice.date, LatestPrice.previous_price, LatestPrice.previous_date)
+        )
+    }
+
+def ingest(prices, with_deltas=True):
+    """Upsert (vendor_id, days after DAY, price) rows and fold them in, as Scraper.ingest does."""
+    rows = [{'vendor_id': vendor_id, 'date': DAY + timedelta(days=days), 'price': price} for vendor_id, days, price in prices]
+    upsert(PriceData, rows, ['vendor_id', 'date'], ['price'])
+    refresh_latest_prices(rows, with_deltas=with_deltas)
+    db.session.commit()
+
+def assert_matches_rebuild(with_deltas=True):
+    incremental = snapshot()
+    db.session.execute(db.delete(LatestPrice))
+    rebuild_latest_prices(with_deltas=with_deltas)
+    assert incremental == snapshot()
+    return incremental
+
+@pytest.mark.parametrize('with_deltas', [True, False])
+def test_first_price(store, with_deltas):
+    ingest([(1, 0, 3.1)], with_deltas)
+    assert assert_matches_rebuild(with_deltas)[1] == (3.1, DAY, None, None)
+
+@pytest.mark.parametrize('with_deltas', [True, False])
+def test_revising_current_price(store, with_deltas):
+    ingest([(1, 0, 3.1), (1, 1, 3.2), (2, 1, 2.9)], with_deltas)
+    ingest([(1, 1, 3.0)], with_deltas)
+    latest = assert_matches_rebuild(with_deltas)
+    assert latest[1] == (3.0, DAY + timedelta(days=1), 3.1 if with_deltas else None, DAY if with_deltas else None)
+
+@pytest.mark.parametrize('with_deltas', [True, False])
+def test_adding_older_date(store, with_deltas):
+    ingest([(1, 5, 3.2), (1, 3, 3.3)], with_deltas)
+    # Between the current and previous prices, then older than both
+    ingest([(1, 4, 3.25)], with_deltas)
+    assert_matches_rebuild(with_deltas)
+    ingest([(1, 1, 3.4)], with_deltas)
+    latest = assert_matches_rebuild(with_deltas)
+    assert latest[1][:2] == (3.2, DAY + timedelta(days=5))
+
+def test_mixed_batches(store):
+    ingest([(1, 0, 3.1), (2, 0, 2.9)])
+    ingest([(1, 2, 3.0), (2, -1, 2.8), (1, 1, 3.05)])
+    ingest([(2, 0, 2.85), (2, 3, 2.7), (1, 2, 2.95)])
+    assert_matches_rebuild()
@@ -0,0 +1,165 @@
+"""Scraper ingest: unchanged-page skips, vendor resolution and batch writes."""
+import os
+from datetime import date
+from types import SimpleNamespace
+import pytest
+from conftest import FIXTURES
+from app import app
+import scraper as scraper_module
+from models import db, Vendor, PriceData, ZoneState, current_data_version, upsert
+from scraper import Scraper, first_table_markup
+
+ZONE = 'rhodeisland/zone4'
+
+def read(name):
+    with open(os.path.join(FIXTURES, 'pages', name), 'rb') as f:
+        return f.read()
+
+def test_fingerprint_skips_tables_in_comments_and_scripts():
+    table = b'<table><tr><td>Dime Oil</td></tr><table><tr><td>nested</td></tr></table></table>'
+    page = (
+        b'<html><!-- old layout: <table><tr><td>x</td></tr></table> -->'
+        b'<script>document.write("<table>");</script><STYLE>table { }</STYLE>'
+        b'<SCRIPT type="text/javascript">var t = "</table>";</SCRIPT>'
+        + table + b'<table><tr><td>footer</td></tr></table></html>'
+    )
+    assert first_table_markup(page) == table
+    assert first_table_markup(b'<html><!-- <table></table> --></html>') is None
+
+class StubSite:
+    """Answers zone page requests like the real site, honouring If-None-Match."""
+
+    def __init__(self, pages, etag):
+        self.pages = pages
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append(headers)
+        zone = url.split('://', 1)[1].split('/', 1)[1].split('.asp', 1)[0]
+        status = 304 if headers.get('If-None-Match') == self.etag else 200
+        return SimpleNamespace(
+            url=url,
+            status_code=status,
+            content=b'' if status == 304 else self.pages[zone],
+            headers={'ETag': self.etag},
+            raise_for_status=lambda: None,
+        )
+
+def stub_scraper(stub, zones, monkeypatch):
+    scraper = Scraper(zones=zones, base_url='http://stub')
+    monkeypatch.setattr(scraper.session, 'get', stub.get)
+    return scraper
+
+@pytest.fixture
+def site(monkeypatch):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        stub = StubSite({ZONE: read('rhodeisland_zone4.html')}, '"a"')
+        stub.scraper = stub_scraper(stub, [ZONE], monkeypatch)
+        yield stub
+        db.session.remove()
+
+def prices():
+    return dict(db.session.execute(db.select(PriceData.id, PriceData.price)).all())
+
+def test_first_scrape_ingests_and_saves_zone_state(site):
+    summary = site.scraper.scrape()
+    assert summary['zones'] == [ZONE]
+    assert summary['rows'] == len(prices()) > 0
+    state = db.session.get(ZoneState, ZONE)
+    assert state.etag == '"a"'
+    assert state.table_hash is not None
+
+def test_not_modified_page_is_skipped(site):
+    site.scraper.scrape()
+    before = prices(), current_data_version()
+
+    summary = site.scraper.scrape()
+    assert site.requests[-1]['If-None-Match'] == '"a"'
+    assert summary == {'zones': [], 'unchanged': [ZONE], 'rows': 0, 'failed': {}}
+    assert (prices(), current_data_version()) == before
+
+def test_same_table_with_new_etag_only_updates_state(site):
+    site.scraper.scrape()
+    table_hash = db.session.get(ZoneState, ZONE).table_hash
+    before = prices(), current_data_version()
+
+    # The page around the table changed, so the server hands out a new validator
+    site.etag = '"b"'
+    site.pages[ZONE] = site.pages[ZONE].replace(b'</body>', b'<p>Updated hourly</p></body>')
+    summary = site.scraper.scrape()
+    assert summary['unchanged'] == [ZONE] and summary['rows'] == 0
+    db.session.expire_all()
+    state = db.session.get(ZoneState, ZONE)
+    assert (state.etag, state.table_hash) == ('"b"', table_hash)
+    assert (prices(), current_data_version()) == before
+
+def test_changed_table_is_ingested(site):
+    site.scraper.scrape()
+    table_hash = db.session.get(ZoneState, ZONE).table_hash
+
+    site.etag = '"c"'
+    site.pages[ZONE] = site.pages[ZONE].replace(b'$3.323', b'$3.199', 1)
+    summary = site.scraper.scrape()
+    assert summary['zones'] == [ZONE]
+    db.session.expire_all()
+    assert db.session.get(ZoneState, ZONE).table_hash != table_hash
+    assert 3.199 in prices().values() and 3.323 not in prices().values()
+
+def test_repeated_row_in_a_batch_writes_once(site):
+    records = [
+        (ZONE, 'Dime Oil', 'Warwick', 3.1, date(2026, 1, 5)),
+        (ZONE, 'Dime Oil', 'Warwick', 3.0, date(2026, 1, 5)),
+        (ZONE, 'Dime Oil', 'Warwick', 3.2, date(2026, 1, 4)),
+    ]
+    assert site.scraper.ingest(records) == 2
+    vendor = Vendor.query.one()
+    assert dict(db.session.execute(db.select(PriceData.date, PriceData.price).filter_by(vendor_id=vendor.id)).all()) == {
+        date(2026, 1, 5): 3.0,
+        date(2026, 1, 4): 3.2,
+    }
+
+def test_vendor_created_by_another_writer_is_reused(site, monkeypatch):
+    # The other process inserts the vendor between this ingest's lookup and its own insert
+    def racing_upsert(model, rows, *args):
+        if model is Vendor:
+            db.session.add(Vendor(name='Dime Oil', town='Warwick', zone=ZONE))
+            db.session.flush()
+        return upsert(model, rows, *args)
+    monkeypatch.setattr(scraper_module, 'upsert', racing_upsert)
+    site.scraper.ingest([(ZONE, 'Dime Oil', 'Warwick', 3.1, date(2026, 1, 5))])
+    vendor = Vendor.query.one()
+    assert db.session.execute(db.select(PriceData.vendor_id)).scalars().all() == [vendor.id]
+
+def test_zones_are_fetched_concurrently_and_ingested_together(site, monkeypatch):
+    zones = ['connecticut/zone1', 'newhampshire/zone2', ZONE, 'vermont/zone1', 'maine/zone3']
+    site.pages.update({zone: read(zone.replace('/', '_') + '.html') for zone in zones})
+    scraper = stub_scraper(site, zones, monkeypatch)
+    scraper.max_workers = 4
+
+    summary = scraper.scrape()
+    assert sorted(summary['zones']) == sorted(zones[:4])
+    assert list(summary['failed']) == ['maine/zone3']
+    assert summary['rows'] == len(prices()) > 0
+    # Every zone's rows went in under that zone's vendors
+    for zone in zones[:4]:
+        expected = {record[1] for record in scraper.extract(site.pages[zone], zone)}
+        assert set(db.session.execute(db.select(Vendor.name).filter_by(zone=zone)).scalars()) == expected
+
+def test_same_vendor_name_in_two_zones_gets_separate_ids(site):
+    other = 'massachusetts/zone10'
+    day = date(2026, 1, 5)
+    records = [(ZONE, 'Dime Oil', 'Warwick', 3.1, day), (other, 'Dime Oil', 'Fall River', 2.9, day)]
+    ids = site.scraper.resolve_vendors(records)
+    assert len(set(ids.values())) == 2
+    site.scraper.ingest(records)
+    stored = db.session.execute(
+        db.select(Vendor.zone, Vendor.town, PriceData.price).join(PriceData).filter(Vendor.name == 'Dime Oil')
+    ).all()
+    assert sorted(stored) == [(other, 'Fall River', 2.9), (ZONE, 'Warwick', 3.1)]
+    # A later batch resolves to the same vendors instead of creating more
+    assert site.scraper.resolve_vendors(records) == ids
+    assert Vendor.query.count() == 2
@@ -0,0 +1,64 @@
+"""The trends page's data paths keep same-named vendors of different zones apart."""
+from datetime import datetime, timedelta
+import pytest
+from app import app
+from models import db, User, Vendor, PriceData, LatestPrice, bump_data_version
+from rollups import rebuild_rollups
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        today = datetime.now().date()
+        db.session.add(User(id=1, username='tester', password_hash='-'))
+        db.session.add_all([
+            Vendor(id=1, name='Dime Oil', zone='rhodeisland/zone4'),
+            Vendor(id=2, name='Dime Oil', zone='massachusetts/zone10'),
+        ])
+        version = bump_data_version()
+        for vendor_id, price in ((1, 3.0), (2, 2.5)):
+            for days in (1, 400):
+                db.session.add(PriceData(vendor_id=vendor_id, date=today - timedelta(days=days), price=price, version=version))
+            db.session.add(LatestPrice(vendor_id=vendor_id, date=today - timedelta(days=1), price=price))
+        db.session.commit()
+        rebuild_rollups()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = '1'
+        yield client
+        db.session.remove()
+
+def test_page_lists_vendors_by_id_with_zone(client):
+    page = client.get('/trends').get_data(as_text=True)
+    assert 'value="1"' in page and 'value="2"' in page
+    assert 'Dime Oil (rhodeisland/zone4)' in page
+    assert 'Dime Oil (massachusetts/zone10)' in page
+
+def test_delta_keys_vendors_by_id(client):
+    delta = client.get('/api/trends/delta?since=0').get_json()
+    assert delta['full']
+    # Only the stored range is synced, so the 400-day-old points are left out
+    assert sorted(delta['vendors']) == ['1', '2']
+    assert delta['vendors']['1'] == [3.0] and delta['vendors']['2'] == [2.5]
+
+def test_long_window_reads_rollups_by_id(client):
+    payload = client.get(
+        '/trends?time_window=1825&format=columnar',
+        headers={'X-Requested-With': 'XMLHttpRequest'},
+    ).get_json()
+    assert payload['granularity'] == 'month'
+    assert sorted(payload['vendors']) == ['1', '2']
+    for vendor_id, price in (('1', 3.0), ('2', 2.5)):
+        column = payload['vendors'][vendor_id]
+        assert {value for value in column if value is not None} == {price}
+
+def test_top_vendors_ranked_by_series_api(client):
+    payload = client.get('/api/prices/series?top_n=1&federal=0&max_points=3').get_json()
+    assert [vendor['id'] for vendor in payload['selected']] == [2]
+
+def test_legacy_payload_keeps_vendor_names(client):
+    payload = client.get('/trends?time_window=1825', headers={'X-Requested-With': 'XMLHttpRequest'}).get_json()
+    assert list(payload['vendors']) == ['Dime Oil']
+    assert sorted(payload['vendors']['Dime Oil']['prices']) == [2.5, 2.5, 3.0, 3.0]